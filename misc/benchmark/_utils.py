@@ -10,6 +10,7 @@ from src.core.utils import load_map_from_file
 
 random.seed(42069)
 IMAGES_DIR = "images_filled/"
+MAP_CACHE_DIR = ".cache/maps/"
 
 
 def setup(
@@ -17,16 +18,18 @@ def setup(
 ) -> list[tuple[str, Map, list[UAV]]]:
     tests = []
     for img_file in os.listdir(IMAGES_DIR):
-        my_map = load_map_from_file(os.path.join(IMAGES_DIR, img_file))
-        my_uavs = [UAV(has_color=False) for _ in range(num_uavs)]
+        my_map = load_map_from_file(
+            os.path.join(IMAGES_DIR, img_file), cache_dir=MAP_CACHE_DIR
+        )
+        # Benchmarks move UAVs thousands of times per event, keep no history
+        my_uavs = [UAV(has_color=False, history_capacity=0) for _ in range(num_uavs)]
         if init_uav_pos:
             for my_uav in my_uavs:
                 start = random.choice(my_map.free_cells)
                 my_uav.r, my_uav.c = start.r, start.c
 
         if init_assign:
-            for cell in my_map.free_cells:
-                cell.assign = my_uavs[0].name
+            my_map.set_assignment_matrix(-1 * my_map.to_numpy(), my_uavs[:1])
         tests.append((img_file, my_map, my_uavs))
     return tests
 
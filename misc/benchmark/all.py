@@ -2,6 +2,7 @@ import argparse
 import random
 
 from misc.benchmark._utils import get_logger, movements, setup, time_func
+from src.core.fleet import Fleet
 from src.core.uav import uav_name_generator
 from src.planner.cpp.continuous.planner import ContinuousCoveragePathPlanner
 from src.planner.cpp.utils import get_assign_count, map_to_assignment_matrix
@@ -25,7 +26,7 @@ if __name__ == "__main__":
     planner, handler = args.planner, args.handler
     for map_name, _map, _uavs in test_cases:
         continuous_planner = ContinuousCoveragePathPlanner(
-            _uavs, _map, multi_planner=planner, handler=handler
+            _uavs, _map, multi_planner=planner, handler=handler, history_capacity=0
         )
         init_plan_time, success = time_func(continuous_planner.plan)
         assigned = map_to_assignment_matrix(_map, _uavs)
@@ -42,10 +43,9 @@ if __name__ == "__main__":
             "|".join([str(count) for count in assign_count]),
         )
 
+        fleet = Fleet(_uavs)
         for i, (movement, add_new) in enumerate(moves):
-            for _ in range(movement):
-                for uav in _uavs:
-                    uav.move()
+            fleet.step(movement)
             if add_new:
                 replan_time, success = time_func(
                     continuous_planner.handle_new_uav, uav_name_generator()
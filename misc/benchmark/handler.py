@@ -2,6 +2,7 @@ import argparse
 import random
 
 from misc.benchmark._utils import setup, get_logger, movements, time_func
+from src.core.fleet import Fleet
 from src.core.uav import uav_name_generator
 from src.planner.cpp.continuous.planner import ContinuousCoveragePathPlanner
 from src.planner.cpp.utils import map_to_assignment_matrix, get_assign_count
@@ -20,6 +21,12 @@ if __name__ == "__main__":
     parser.add_argument("-o", "--output", default="handler.log", help="Output log file")
     parser.add_argument("-n", "--num-uavs", default=8, type=int, help="Number of UAVS")
     parser.add_argument("-c", "--change", default=5, type=int, help="Number of changes")
+    parser.add_argument(
+        "-w", "--workers", default=0, type=int, help="Number of transfer workers"
+    )
+    parser.add_argument(
+        "--plan-workers", default=0, type=int, help="Number of single planner workers"
+    )
     args = parser.parse_args()
     logger = get_logger(args.output)
     test_cases = setup(args.num_uavs)
@@ -27,14 +34,19 @@ if __name__ == "__main__":
     for handler in args.handlers:
         for map_name, _map, _uavs in test_cases:
             continuous_planner = ContinuousCoveragePathPlanner(
-                _uavs, _map, multi_planner="Transfer", handler=handler
+                _uavs,
+                _map,
+                multi_planner="Transfer",
+                handler=handler,
+                history_capacity=0,
+                transfer_workers=args.workers,
+                plan_workers=args.plan_workers,
             )
             continuous_planner.plan()
 
+            fleet = Fleet(_uavs)
             for i, (movement, add_new) in enumerate(moves):
-                for _ in range(movement):
-                    for uav in _uavs:
-                        uav.move()
+                fleet.step(movement)
                 if add_new:
                     replan_time, success = time_func(
                         continuous_planner.handle_new_uav, uav_name_generator()
@@ -59,3 +71,4 @@ if __name__ == "__main__":
 
                 if not success:
                     break
+            continuous_planner.close()
@@ -16,15 +16,29 @@ if __name__ == "__main__":
     )
     parser.add_argument("-o", "--output", default="multi.log", help="Output log file")
     parser.add_argument("-n", "--num-uavs", default=8, type=int, help="Number of UAVS")
+    parser.add_argument(
+        "--plan-workers", default=0, type=int, help="Number of single planner workers"
+    )
+    parser.add_argument(
+        "--initial-assign",
+        default="voronoi",
+        choices=["voronoi", "balanced"],
+        help="Initial partition of the Transfer planner",
+    )
     args = parser.parse_args()
     logger = get_logger(args.output)
     test_cases = setup(args.num_uavs)
     for planner in args.planners:
         for map_name, _map, _uavs in test_cases:
             multi_planner = MultiCoveragePathPlannerFactory.get_planner(
-                planner, _uavs, _map
+                planner,
+                _uavs,
+                _map,
+                plan_workers=args.plan_workers,
+                initial_assign=args.initial_assign,
             )
             plan_time, success = time_func(multi_planner.plan)
+            multi_planner.close()
 
             assigned = map_to_assignment_matrix(_map, _uavs)
             assign_count = get_assign_count(assigned, len(_uavs))
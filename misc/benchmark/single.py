@@ -13,6 +13,9 @@ if __name__ == "__main__":
         default=["kruskal", "dfs"],
         help="MST Algorithm",
     )
+    parser.add_argument(
+        "-p", "--planner", default="STC", help="Single coverage path planner"
+    )
     parser.add_argument("-o", "--output", default="single.log", help="Output log file")
     args = parser.parse_args()
     logger = get_logger(args.output)
@@ -21,7 +24,7 @@ if __name__ == "__main__":
         for map_name, _map, _uavs in test_cases:
             uav = _uavs[0]
             planner = SingleCoveragePathPlannerFactory.get_planner(
-                "STC", _map, uav, mst_algo=algo
+                args.planner, _map, uav, mst_algo=algo
             )
             coverage_time, success = time_func(planner.plan)
 
@@ -10,20 +10,19 @@ cmd = "python multiRobotPathPlanner.py -grid {width} {height} -obs_pos {obs_pos}
 
 def convert_to_darp(_map: Map, uavs: list[UAV]) -> None:
     free_cells = _map.free_cells
-    obs_cells = _map.occupied_cells
     used_cells = set()
 
     for uav in uavs:
         while uav.r is None or uav.c is None:
             free_cell = random.choice(free_cells)
-            if free_cell in used_cells:
+            if free_cell.coordinate in used_cells:
                 continue
-            used_cells.add(free_cell)
-            uav.r = free_cell[0]
-            uav.c = free_cell[1]
+            used_cells.add(free_cell.coordinate)
+            uav.r = free_cell.r
+            uav.c = free_cell.c
             # print(f"{uav.name} starts at {(uav.r, uav.c)}")
 
-    obs_pos = [str(_map.width * obs[0] + obs[1]) for obs in obs_cells]
+    obs_pos = [str(obs) for obs in sorted(_map.occupied_cell_indices.tolist())]
     in_pos = [str(_map.width * uav.r + uav.c) for uav in uavs]  # type: ignore
 
     formatted_cmd = cmd.format(
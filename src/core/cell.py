@@ -11,6 +11,8 @@ class CellType(Enum):
 
 
 class Cell:
+    __slots__ = ("cell_type", "r", "c", "assign")
+
     def __init__(self, cell_type: CellType, r: int, c: int, assign: str = ""):
         self.cell_type: CellType = cell_type
         self.r = r
@@ -0,0 +1,91 @@
+import numpy as np
+
+from src.core.uav import UAV
+
+
+class Fleet:
+    """
+    Packed state of a list of UAVs, used to move all of them at once.
+    Trajectories are concatenated into one (N, 2) array, UAV i owns the rows
+    `offsets[i]:offsets[i] + lengths[i]` and is at row `offsets[i] + pos_idx[i]`.
+    The packed arrays are rebuilt whenever a UAV joins, leaves or gets a new trajectory.
+    """
+
+    def __init__(self, uavs: list[UAV]):
+        self.uavs = uavs
+        self._members: list[tuple[UAV, np.ndarray | None]] = []
+        self.trajectories = np.empty((0, 2), dtype=np.int32)
+        self.offsets = np.empty(0, dtype=np.intp)
+        self.lengths = np.empty(0, dtype=np.intp)
+        self.pos_idx = np.empty(0, dtype=np.intp)
+        self.rebuild()
+
+    @property
+    def positions(self) -> np.ndarray:
+        """
+        :return: An (n, 2) array of the (r, c) position of each UAV
+        """
+        return self.trajectories[self.offsets + self.pos_idx]
+
+    def rebuild(self) -> None:
+        for uav in self.uavs:
+            if uav.pos_idx is None:
+                raise ValueError(f"{uav} position index is not initialized")
+            if uav.trajectory is None:
+                raise ValueError(f"{uav} trajectory is not initialized")
+        self._members = [(uav, uav.trajectory) for uav in self.uavs]
+        self.lengths = np.array(
+            [len(uav.trajectory) for uav in self.uavs], dtype=np.intp  # type: ignore
+        )
+        self.offsets = np.zeros(len(self.uavs), dtype=np.intp)
+        np.cumsum(self.lengths[:-1], out=self.offsets[1:])
+        self.trajectories = (
+            np.concatenate([uav.trajectory for uav in self.uavs])  # type: ignore
+            if self.uavs
+            else np.empty((0, 2), dtype=np.int32)
+        )
+        self.pos_idx = np.array([uav.pos_idx for uav in self.uavs], dtype=np.intp)
+
+    def step(self, k: int = 1) -> None:
+        """
+        Move every UAV `k` steps along its trajectory, same as calling `move` k times on each UAV
+        :param k: The number of steps
+        """
+        if k < 0:
+            raise ValueError(f"Invalid number of steps {k}")
+        if self._is_stale():
+            self.rebuild()
+        else:
+            # Positions may have been reset by a planner since the last step
+            self.pos_idx = np.array([uav.pos_idx for uav in self.uavs], dtype=np.intp)
+        if k == 0 or not self.uavs:
+            return
+
+        self._record_history(k)
+        self.pos_idx = (self.pos_idx + k) % self.lengths
+        positions = self.positions.tolist()
+        for uav, pos_idx, (r, c) in zip(self.uavs, self.pos_idx.tolist(), positions):
+            uav.pos_idx = pos_idx
+            uav.r = r
+            uav.c = c
+
+    def _record_history(self, k: int) -> None:
+        for i, uav in enumerate(self.uavs):
+            history = uav.history
+            window = history.window()
+            count = k if window is None else min(k, window)
+            history.skip(k - count)
+            if count == 0:
+                continue
+            # Only the last `count` steps can still be in the history afterwards
+            steps = self.pos_idx[i] + np.arange(k - count + 1, k + 1)
+            rows = self.offsets[i] + steps % self.lengths[i]
+            history.extend(self.trajectories[rows])
+
+    def _is_stale(self) -> bool:
+        if len(self._members) != len(self.uavs):
+            return True
+        return any(
+            member is not uav or trajectory is not uav.trajectory
+            for (member, trajectory), uav in zip(self._members, self.uavs)
+        )
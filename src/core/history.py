@@ -0,0 +1,114 @@
+import numpy as np
+
+_INITIAL_SIZE = 64
+
+
+class MovementHistory:
+    """
+    Record of the cells a UAV moved through, stored in a preallocated int array.
+    - capacity=None keeps every record, growing the array as needed
+    - capacity=k keeps the last k records in a ring buffer
+    - capacity=0 keeps nothing
+    With stride=s only one of every s moves is recorded (the first record is always kept).
+    """
+
+    def __init__(self, capacity: int | None = None, stride: int = 1):
+        if capacity is not None and capacity < 0:
+            raise ValueError(f"Invalid history capacity {capacity}")
+        if stride < 1:
+            raise ValueError(f"Invalid history stride {stride}")
+        self.capacity = capacity
+        self.stride = stride
+        size = _INITIAL_SIZE if capacity is None else capacity
+        self._records = np.empty((size, 2), dtype=np.int32)
+        self._start = 0  # Index of the oldest record
+        self._size = 0  # Number of records kept
+        self._moves = 0  # Number of moves seen, recorded or not
+
+    def append(self, r: int, c: int) -> None:
+        moves = self._moves
+        self._moves += 1
+        if moves % self.stride != 0 or self.capacity == 0:
+            return
+        if self.capacity is None:
+            if self._size == len(self._records):
+                self._records = np.concatenate(
+                    (self._records, np.empty_like(self._records))
+                )
+            self._records[self._size] = r, c
+            self._size += 1
+        elif self._size < self.capacity:
+            self._records[self._size] = r, c
+            self._size += 1
+        else:
+            self._records[self._start] = r, c
+            self._start = (self._start + 1) % self.capacity
+
+    def extend(self, records: np.ndarray) -> None:
+        """
+        Append consecutive moves in bulk, same as calling `append` on each of them.
+        :param records: An (N, 2) array of (r, c)
+        """
+        moves = self._moves
+        self._moves += len(records)
+        if self.capacity == 0:
+            return
+        # Skip the moves that fall between two recorded ones
+        records = records[(-moves) % self.stride :: self.stride]
+        if self.capacity is None:
+            count = len(records)
+            size = len(self._records)
+            while size < self._size + count:
+                size *= 2
+            if size > len(self._records):
+                grown = np.empty((size, 2), dtype=np.int32)
+                grown[: self._size] = self._records[: self._size]
+                self._records = grown
+            self._records[self._size : self._size + count] = records
+            self._size += count
+            return
+
+        records = records[-self.capacity :]
+        end = self._start + self._size
+        slots = (end + np.arange(len(records))) % self.capacity
+        self._records[slots] = records
+        overflow = max(self._size + len(records) - self.capacity, 0)
+        self._size = min(self._size + len(records), self.capacity)
+        self._start = (self._start + overflow) % self.capacity
+
+    def skip(self, count: int) -> None:
+        """
+        Count moves without recording them.
+        Only valid when the skipped moves would be evicted by the following ones anyway.
+        """
+        self._moves += count
+
+    def window(self) -> int | None:
+        """
+        :return: The number of most recent moves that can end up in the history, None if unbounded
+        """
+        if self.capacity is None:
+            return None
+        return self.capacity * self.stride
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        Export the retained window.
+        :return: An (N, 2) array of (r, c), oldest first
+        """
+        if self._start == 0:
+            return self._records[: self._size].copy()
+        return np.concatenate(
+            (self._records[self._start : self._size], self._records[: self._start])
+        )
+
+    def tolist(self) -> list[tuple[int, int]]:
+        return [(r, c) for r, c in self.to_numpy().tolist()]
+
+    def clear(self) -> None:
+        self._start = 0
+        self._size = 0
+        self._moves = 0
+
+    def __len__(self) -> int:
+        return self._size
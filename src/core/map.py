@@ -1,74 +1,280 @@
-from functools import cached_property
+from collections.abc import Iterator, Sequence
 
 import numpy as np
 
 from src.core.cell import Cell, CellType
 from src.core.uav import UAV
 
+_CELL_TYPES = tuple(CellType)  # CellType indexed by its value
+_UNASSIGNED = -1
+
 
 class Map:
-    def __init__(self, cells: list[list[Cell]]):
-        self.cells = cells
-        self.height = len(cells)
-        self.width = len(cells[0])
+    """
+    Grid map backed by contiguous NumPy arrays.
+    Cell types are kept in a uint8 array and assignments in an int32 label array,
+    `Cell` objects are only created as lightweight views when a caller asks for them.
+    """
+
+    def __init__(self, cell_types: np.ndarray, type_counts: np.ndarray | None = None):
+        """
+        :param cell_types: 2D array of `CellType` values, used without a copy when it is
+                           already a contiguous uint8 array (e.g. a memory-mapped file)
+        :param type_counts: Known number of cells of each `CellType`, indexed by value
+        """
+        self.height, self.width = cell_types.shape
+        self._cell_types = np.ascontiguousarray(cell_types, dtype=np.uint8)
+        self._assignment = np.full(cell_types.shape, _UNASSIGNED, dtype=np.int32)
+        self._assignees: list[str] = []
+        self._assignee_labels: dict[str, int] = {}
+        # Incremented whenever a cell type changes
+        self.version = 0
+        # Built lazily, then maintained on every cell type change
+        self._type_counts: np.ndarray | None = (
+            None if type_counts is None else np.array(type_counts, dtype=np.intp)
+        )
+        self._cell_indices: dict[CellType, _CellIndex] = {}
 
     @staticmethod
     def create_empty_map(width: int, height: int) -> "Map":
-        cells = [
-            [Cell(CellType.FREE, r, c) for c in range(width)] for r in range(height)
-        ]
-        return Map(cells)
+        return Map(np.full((height, width), CellType.FREE.value, dtype=np.uint8))
 
     @staticmethod
     def from_numpy(array: np.ndarray) -> "Map":
-        height, width = array.shape
-        cells = []
-        for i in range(height):
-            row = []
-            for j in range(width):
-                row.append(Cell(CellType(int(array[i, j])), i, j))
-            cells.append(row)
-        return Map(cells)
+        return Map(np.array(array, dtype=np.uint8))
+
+    @property
+    def cells(self) -> list[list[Cell]]:
+        return [
+            [_CellView(self, r, c) for c in range(self.width)]
+            for r in range(self.height)
+        ]
 
     def get_cell(self, r: int, c: int) -> Cell:
-        return self.cells[r][c]
+        return _CellView(self, r, c)
+
+    def set_cell_type(self, r: int, c: int, cell_type: CellType) -> None:
+        old_cell_type = _CELL_TYPES[self._cell_types[r, c]]
+        if old_cell_type == cell_type:
+            return
+        self._cell_types[r, c] = cell_type.value
+        if cell_type != CellType.FREE:
+            self._assignment[r, c] = _UNASSIGNED
+
+        if self._type_counts is not None:
+            self._type_counts[old_cell_type.value] -= 1
+            self._type_counts[cell_type.value] += 1
+        flat_index = r * self.width + c
+        if old_cell_type in self._cell_indices:
+            self._cell_indices[old_cell_type].remove(flat_index)
+        if cell_type in self._cell_indices:
+            self._cell_indices[cell_type].add(flat_index)
+        self.version += 1
 
     def to_numpy(self) -> np.ndarray:
-        return np.array(
-            [[cell.cell_type.value for cell in row] for row in self.cells],
-            dtype=np.uint8,
-        )
+        return self._cell_types.copy()
 
     def assign(self, r: int, c: int, uav: UAV) -> None:
-        self.cells[r][c].assign = uav.name
+        self._assignment[r, c] = self._get_label(uav.name)
 
     def clear_assignment(self) -> None:
-        for row in self.cells:
-            for cell in row:
-                cell.assign = ""
+        self._assignment.fill(_UNASSIGNED)
+        self._set_assignees([])
 
-    @cached_property
-    def free_cells(self) -> list[Cell]:
-        return [
-            cell
-            for row in self.cells
-            for cell in row
-            if cell.cell_type == CellType.FREE
-        ]
+    def get_assignment_matrix(self, uavs: list[UAV]) -> np.ndarray:
+        """
+        Get the assignment matrix of `uavs` to cells.
+        The matrix is the map's own label array (no copy), writing to it changes the assignment.
+        :param uavs: The uavs, labeled by their index
+        :return: A 2D int32 array where the value at (r, c) is the index of the uav assigned to it
+                 Occupied and unassigned cells are labeled -1
+        """
+        names = [uav.name for uav in uavs]
+        if names[: len(self._assignees)] != self._assignees:
+            labels = {name: i for i, name in enumerate(names)}
+            # The trailing entry is picked up by unassigned cells (label -1)
+            relabel = np.array(
+                [labels.get(name, _UNASSIGNED) for name in self._assignees]
+                + [_UNASSIGNED],
+                dtype=np.int32,
+            )
+            self._assignment[...] = relabel[self._assignment]
+        self._set_assignees(names)
+        return self._assignment
 
-    @cached_property
-    def occupied_cells(self) -> list[Cell]:
-        return [
-            cell
-            for row in self.cells
-            for cell in row
-            if cell.cell_type == CellType.OCCUPIED
-        ]
+    def set_assignment_matrix(
+        self, assignment_matrix: np.ndarray, uavs: list[UAV]
+    ) -> None:
+        """
+        Assign cells to `uavs` in bulk.
+        :param assignment_matrix: A 2D array where the value at (r, c) is the index of the uav assigned to it
+                                  Occupied cells are assigned any number < 0
+        :param uavs: The uavs, labeled by their index
+        """
+        if assignment_matrix is not self._assignment:
+            np.maximum(assignment_matrix, _UNASSIGNED, out=self._assignment)
+        self._set_assignees([uav.name for uav in uavs])
+
+    def get_assigned_mask(self, uav: UAV) -> np.ndarray:
+        """
+        Get the free cells assigned to `uav`
+        :param uav: The assignee
+        :return: A boolean array of the map's shape
+        """
+        label = self._assignee_labels.get(uav.name, None)
+        if label is None:
+            return np.zeros((self.height, self.width), dtype=bool)
+        return (self._assignment == label) & (self._cell_types == CellType.FREE.value)
+
+    @property
+    def free_cells(self) -> Sequence[Cell]:
+        return _CellSequence(self, CellType.FREE)
+
+    @property
+    def occupied_cells(self) -> Sequence[Cell]:
+        return _CellSequence(self, CellType.OCCUPIED)
+
+    @property
+    def free_cell_count(self) -> int:
+        return self._get_type_count(CellType.FREE)
+
+    @property
+    def occupied_cell_count(self) -> int:
+        return self._get_type_count(CellType.OCCUPIED)
+
+    @property
+    def free_cell_indices(self) -> np.ndarray:
+        """
+        Flat indices (r * width + c) of the free cells.
+        The returned array is only valid until the next cell type change, see `version`.
+        """
+        return self._get_cell_index(CellType.FREE).cells()
+
+    @property
+    def occupied_cell_indices(self) -> np.ndarray:
+        """
+        Flat indices (r * width + c) of the occupied cells.
+        The returned array is only valid until the next cell type change, see `version`.
+        """
+        return self._get_cell_index(CellType.OCCUPIED).cells()
+
+    def _get_type_count(self, cell_type: CellType) -> int:
+        if self._type_counts is None:
+            self._type_counts = np.bincount(
+                self._cell_types.ravel(), minlength=len(_CELL_TYPES)
+            )
+        return int(self._type_counts[cell_type.value])
+
+    def _get_cell_index(self, cell_type: CellType) -> "_CellIndex":
+        cell_index = self._cell_indices.get(cell_type, None)
+        if cell_index is None:
+            cell_index = _CellIndex(self._cell_types.ravel() == cell_type.value)
+            self._cell_indices[cell_type] = cell_index
+        return cell_index
+
+    def _get_label(self, name: str) -> int:
+        label = self._assignee_labels.get(name, None)
+        if label is None:
+            label = len(self._assignees)
+            self._assignees.append(name)
+            self._assignee_labels[name] = label
+        return label
+
+    def _set_assignees(self, names: list[str]) -> None:
+        self._assignees = names
+        self._assignee_labels = {name: label for label, name in enumerate(names)}
 
     def __repr__(self):
         return "\n".join("\t".join(repr(cell) for cell in row) for row in self.cells)
 
     def __str__(self):
         return "\n".join(
-            "\t".join(str(cell.cell_type.value) for cell in row) for row in self.cells
+            "\t".join(str(value) for value in row) for row in self._cell_types.tolist()
+        )
+
+
+class _CellView(Cell):
+    """A `Cell` whose type and assignment are read from and written to its `Map`"""
+
+    __slots__ = ("_map",)
+
+    def __init__(self, _map: Map, r: int, c: int):
+        self._map = _map
+        self.r = r
+        self.c = c
+
+    @property  # type: ignore
+    def cell_type(self) -> CellType:
+        return _CELL_TYPES[self._map._cell_types[self.r, self.c]]
+
+    @cell_type.setter
+    def cell_type(self, cell_type: CellType) -> None:
+        self._map.set_cell_type(self.r, self.c, cell_type)
+
+    @property  # type: ignore
+    def assign(self) -> str:
+        label = self._map._assignment[self.r, self.c]
+        return "" if label == _UNASSIGNED else self._map._assignees[label]
+
+    @assign.setter
+    def assign(self, name: str) -> None:
+        self._map._assignment[self.r, self.c] = (
+            _UNASSIGNED if not name else self._map._get_label(name)
         )
+
+
+class _CellIndex:
+    """
+    Flat indices of the cells of one type, kept as a sparse set:
+    `indices[:count]` holds the cells and `positions` maps a cell back to its slot,
+    so adding or removing a cell is O(1).
+    """
+
+    def __init__(self, mask: np.ndarray):
+        cells = np.flatnonzero(mask)
+        self.count = len(cells)
+        self.indices = np.empty(mask.size, dtype=np.intp)
+        self.indices[: self.count] = cells
+        self.positions = np.full(mask.size, -1, dtype=np.intp)
+        self.positions[cells] = np.arange(self.count)
+
+    def cells(self) -> np.ndarray:
+        return self.indices[: self.count]
+
+    def add(self, cell: int) -> None:
+        self.indices[self.count] = cell
+        self.positions[cell] = self.count
+        self.count += 1
+
+    def remove(self, cell: int) -> None:
+        position = self.positions[cell]
+        last = self.indices[self.count - 1]
+        self.indices[position] = last
+        self.positions[last] = position
+        self.positions[cell] = -1
+        self.count -= 1
+
+
+class _CellSequence(Sequence[Cell]):
+    """Live sequence of the cells of one type, `Cell` views are created on access"""
+
+    def __init__(self, _map: Map, cell_type: CellType):
+        self._map = _map
+        self._cell_type = cell_type
+
+    def __len__(self) -> int:
+        return self._map._get_type_count(self._cell_type)
+
+    def __getitem__(self, index):  # type: ignore
+        cells = self._map._get_cell_index(self._cell_type).cells()
+        if isinstance(index, slice):
+            return [self._to_cell(cell) for cell in cells[index].tolist()]
+        return self._to_cell(int(cells[index]))
+
+    def __iter__(self) -> Iterator[Cell]:
+        cells = self._map._get_cell_index(self._cell_type).cells()
+        return (self._to_cell(cell) for cell in cells.tolist())
+
+    def _to_cell(self, cell: int) -> Cell:
+        r, c = divmod(cell, self._map.width)
+        return _CellView(self._map, r, c)
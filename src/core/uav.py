@@ -1,7 +1,8 @@
+import numpy as np
 from numpy.random import choice
 
-from src.core.cell import Cell
 from src.core import colors
+from src.core.history import MovementHistory
 
 
 class UAV:
@@ -10,8 +11,10 @@ class UAV:
         name: str | None = None,
         r: int | None = None,
         c: int | None = None,
-        trajectory: list[Cell] | None = None,
+        trajectory: np.ndarray | list[tuple[int, int]] | None = None,
         has_color: bool = True,
+        history_capacity: int | None = None,
+        history_stride: int = 1,
     ):
         if name is None:
             self.name = uav_name_generator()
@@ -19,14 +22,29 @@ class UAV:
             self.name = name
         self.r = r
         self.c = c
-        self.trajectory = trajectory
+        self.trajectory = trajectory  # type: ignore
         self.pos_idx: int | None = None
         if self.r is not None and self.c is not None and self.trajectory is not None:
             self.init_position()
         self.color = colors.ColorManager.get_color() if has_color else colors.BLACK
-        self.movement: list[tuple[int, int]] = (
-            [(r, c)] if r is not None and c is not None else []
+        self.history = MovementHistory(history_capacity, history_stride)
+        if r is not None and c is not None:
+            self.history.append(r, c)
+
+    @property
+    def trajectory(self) -> np.ndarray | None:
+        """The coverage trajectory as an (N, 2) array of (r, c) coordinates"""
+        return self._trajectory
+
+    @trajectory.setter
+    def trajectory(self, trajectory: np.ndarray | list[tuple[int, int]] | None) -> None:
+        self._trajectory = (
+            None
+            if trajectory is None
+            else np.asarray(trajectory, dtype=np.int32).reshape(-1, 2)
         )
+        self._trajectory_length: float | None = None
+        self._position_index: dict[tuple[int, int], int] | None = None
 
     def move(self) -> None:
         if self.pos_idx is None:
@@ -35,49 +53,54 @@ class UAV:
             raise ValueError("UAV trajectory is not initialized")
 
         self.pos_idx = (self.pos_idx + 1) % len(self.trajectory)
-        next_cell = self.trajectory[self.pos_idx]
-        self.r = next_cell.r
-        self.c = next_cell.c
-        self.movement.append((self.r, self.c))
+        next_r, next_c = self.trajectory[self.pos_idx]
+        self.r = int(next_r)
+        self.c = int(next_c)
+        self.history.append(self.r, self.c)
+
+    @property
+    def movement(self) -> list[tuple[int, int]]:
+        """The recorded movement, limited to the window retained by `history`"""
+        return self.history.tolist()
 
     @property
     def trajectory_length(self) -> float:
-        if not self.trajectory:
+        if self.trajectory is None or len(self.trajectory) == 0:
             return 0.0
-        distance = 0.0
-        trajectory_length = len(self.trajectory)
-        for i in range(trajectory_length):
-            distance += self.trajectory[i].distance(
-                self.trajectory[(i + 1) % trajectory_length]
-            )
-        return distance
+        if self._trajectory_length is None:
+            # The trajectory is a cycle, the last step returns to the first cell
+            steps = np.diff(self.trajectory, axis=0, append=self.trajectory[:1])
+            self._trajectory_length = float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+        return self._trajectory_length
 
-    def update_trajectory(self, trajectory: list[Cell]) -> None:
-        self.trajectory = trajectory
+    def update_trajectory(self, trajectory: np.ndarray | list[tuple[int, int]]) -> None:
+        self.trajectory = trajectory  # type: ignore
         if self.r is None or self.c is None:
-            self.r, self.c = self.trajectory[0].r, self.trajectory[0].c
-        if not self.movement:
-            self.movement = [(self.r, self.c)]
+            self.r, self.c = self.trajectory[0].tolist()  # type: ignore
+        if not len(self.history):
+            self.history.append(self.r, self.c)  # type: ignore
         self.init_position()
 
     def init_position(self):
-        found = False
-        for idx, cell in enumerate(self.trajectory):
-            if cell.r == self.r and cell.c == self.c:
-                self.pos_idx = idx
-                found = True
-                break
-        if not found:
+        if self._position_index is None:
+            # Map each coordinate to its first index in the trajectory
+            coordinates = self.trajectory.tolist()  # type: ignore
+            self._position_index = {
+                (r, c): idx for idx, (r, c) in reversed(list(enumerate(coordinates)))
+            }
+        pos_idx = self._position_index.get((self.r, self.c), None)  # type: ignore
+        if pos_idx is None:
             raise ValueError(
                 f"Initial position ({self.r}, {self.c}) not found in trajectory "
-                f"{[(cell.r, cell.c) for cell in self.trajectory]}"
+                f"{self.trajectory.tolist()}"  # type: ignore
             )
+        self.pos_idx = pos_idx
 
     def reset(self):
         self.r = None
         self.c = None
-        self.trajectory = None
-        self.movement = []
+        self.trajectory = None  # type: ignore
+        self.history.clear()
 
     def __repr__(self):
         return f"UAV {self.name}"
@@ -1,21 +1,117 @@
+import hashlib
 import os.path
+import struct
+import tempfile
 
 import cv2
 import numpy as np
 
+from src.core.cell import CellType
 from src.core.map import Map
 
+# Binary map format: a fixed size little-endian header followed by the raw uint8 cell types
+MAP_FILE_MAGIC = b"MUAVMAP\0"
+MAP_FILE_VERSION = 1
+_MAP_HEADER_FORMAT = "<8sHHII4si4q"
+_MAP_HEADER_SIZE = 64  # Header is padded so the cell data is aligned
+_MAP_DTYPE = np.dtype(np.uint8)
 
-def load_map_from_file(filepath: str) -> Map:
+# Parsed map cache, see `load_map_from_file`
+MAP_CACHE_SIZE = 256 * 1024 * 1024  # Bytes
+_MAP_CACHE_VERSION = 1  # Bump to invalidate cached maps when loading changes
+
+
+def load_map_from_file(
+    filepath: str,
+    cache_dir: str | None = None,
+    threshold: int = 0,
+    resize: tuple[int, int] | None = None,
+    cache_size: int = MAP_CACHE_SIZE,
+) -> Map:
+    """
+    :param threshold: Image pixels at or below this gray level are occupied
+    :param resize: Target (width, height) of the map
+    :param cache_dir: Directory caching parsed maps in the binary map format,
+                      keyed by the file content and the loader parameters
+    :param cache_size: Cached maps are evicted, least recently used first, above this size in bytes
+    """
+    if cache_dir is None or not os.path.isfile(filepath):
+        return _load_map_from_file(filepath, threshold, resize)
+
+    with open(filepath, "rb") as f:
+        key = hashlib.sha256(f.read())
+    key.update(f"{_MAP_CACHE_VERSION}|{threshold}|{resize}".encode())
+    cache_file = os.path.join(cache_dir, f"{key.hexdigest()}.map")
+    try:
+        loaded_map = load_map_from_binary_file(cache_file)
+        os.utime(cache_file)
+        return loaded_map
+    except (OSError, ValueError):
+        pass
+
+    loaded_map = _load_map_from_file(filepath, threshold, resize)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write then rename so concurrent loaders never see a partial file
+    fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        save_map_to_binary_file(loaded_map, tmp_file)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # The cached map may be mapped by another loader, e.g. on Windows
+        pass
+    finally:
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+    evict_map_cache(cache_dir, cache_size)
+    return loaded_map
+
+
+def evict_map_cache(cache_dir: str, cache_size: int = MAP_CACHE_SIZE) -> None:
+    """
+    Remove the least recently used cached maps until the cache fits in `cache_size` bytes.
+    Maps that cannot be removed, e.g. mapped by a loader on Windows, are skipped.
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".map"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= cache_size:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+        total_size -= size
+
+
+def _load_map_from_file(
+    filepath: str, threshold: int = 0, resize: tuple[int, int] | None = None
+) -> Map:
     extension = filepath.split(".")[-1]
     if extension in ["png", "jpg", "jpeg", "gif", "bmp", "tiff", "ico"]:
-        return load_map_from_image_file(filepath)
+        loaded_map = load_map_from_image_file(filepath, threshold=threshold)
     elif extension == "txt":
-        return load_map_from_text_file(filepath)
+        loaded_map = load_map_from_text_file(filepath)
+    elif extension == "map":
+        loaded_map = load_map_from_binary_file(filepath)
     else:
         raise ValueError(
             f"Unsupported file extension: {extension} for file: {filepath}"
         )
+    if resize is not None:
+        loaded_map = resize_map(loaded_map, *resize)
+    return loaded_map
 
 
 def save_map_to_file(map_to_save: Map, filepath: str, sep: str = ",") -> None:
@@ -24,6 +120,8 @@ def save_map_to_file(map_to_save: Map, filepath: str, sep: str = ",") -> None:
         save_map_to_image_file(map_to_save, filepath)
     elif extension == "txt":
         save_map_to_text_file(map_to_save, filepath, sep)
+    elif extension == "map":
+        save_map_to_binary_file(map_to_save, filepath)
     else:
         raise ValueError(
             f"Unsupported file extension: {extension} for file: {filepath}"
@@ -35,14 +133,127 @@ def load_map_from_text_file(txt_file_path: str, sep: str = ",") -> Map:
     return Map.from_numpy(cells_np)
 
 
-def load_map_from_image_file(img_file_path: str, img_dir: str = "images") -> Map:
+def load_map_from_image_file(
+    img_file_path: str, img_dir: str = "images", threshold: int = 0
+) -> Map:
     if not os.path.isfile(img_file_path):
         img_file_path = os.path.join(img_dir, img_file_path)
     img = cv2.imread(img_file_path, cv2.IMREAD_GRAYSCALE)
-    img = (img == 0).astype(np.uint8)
+    img = (img <= threshold).astype(np.uint8)
     return Map.from_numpy(img)
 
 
+class MapFileHeader:
+    def __init__(
+        self,
+        height: int,
+        width: int,
+        type_counts: np.ndarray | None = None,
+        components: int | None = None,
+        version: int = MAP_FILE_VERSION,
+    ):
+        """
+        :param type_counts: Number of cells of each `CellType`, indexed by value
+        :param components: Number of 4-connected components of free cells
+        """
+        self.height = height
+        self.width = width
+        self.type_counts = type_counts
+        self.components = components
+        self.version = version
+
+    @property
+    def free_cell_count(self) -> int | None:
+        if self.type_counts is None:
+            return None
+        return int(self.type_counts[CellType.FREE.value])
+
+    def to_bytes(self) -> bytes:
+        type_counts = [-1] * len(CellType)
+        if self.type_counts is not None:
+            type_counts = [int(count) for count in self.type_counts]
+        header = struct.pack(
+            _MAP_HEADER_FORMAT,
+            MAP_FILE_MAGIC,
+            self.version,
+            0,
+            self.height,
+            self.width,
+            _MAP_DTYPE.str.encode(),
+            -1 if self.components is None else self.components,
+            *type_counts,
+        )
+        return header.ljust(_MAP_HEADER_SIZE, b"\0")
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "MapFileHeader":
+        if len(data) < _MAP_HEADER_SIZE:
+            raise ValueError("Truncated map file header")
+        (
+            magic,
+            version,
+            _,
+            height,
+            width,
+            dtype,
+            components,
+            *type_counts,
+        ) = struct.unpack_from(_MAP_HEADER_FORMAT, data)
+        if magic != MAP_FILE_MAGIC:
+            raise ValueError("Not a binary map file")
+        if version != MAP_FILE_VERSION:
+            raise ValueError(f"Unsupported map file version: {version}")
+        dtype = dtype.rstrip(b"\0").decode()
+        if dtype != _MAP_DTYPE.str:
+            raise ValueError(f"Unsupported map file dtype: {dtype}")
+        return MapFileHeader(
+            height,
+            width,
+            None if type_counts[0] < 0 else np.array(type_counts, dtype=np.intp),
+            None if components < 0 else components,
+            version,
+        )
+
+
+def read_map_file_header(map_file_path: str) -> MapFileHeader:
+    with open(map_file_path, "rb") as f:
+        return MapFileHeader.from_bytes(f.read(_MAP_HEADER_SIZE))
+
+
+def load_map_from_binary_file(map_file_path: str) -> Map:
+    """
+    Load a map saved by `save_map_to_binary_file`.
+    The cells are memory-mapped copy-on-write: nothing is read until it is accessed,
+    processes loading the same file share its pages, and changes to the map never reach the file.
+    """
+    header = read_map_file_header(map_file_path)
+    cell_types = np.memmap(
+        map_file_path,
+        dtype=_MAP_DTYPE,
+        mode="c",
+        offset=_MAP_HEADER_SIZE,
+        shape=(header.height, header.width),
+    )
+    return Map(cell_types, type_counts=header.type_counts)
+
+
+def save_map_to_binary_file(
+    map_to_save: Map, map_file_path: str, with_stats: bool = True
+) -> None:
+    """
+    :param with_stats: Also store the cell type counts and number of free components in the header
+    """
+    cell_types = map_to_save.to_numpy()
+    header = MapFileHeader(map_to_save.height, map_to_save.width)
+    if with_stats:
+        header.type_counts = np.bincount(cell_types.ravel(), minlength=len(CellType))
+        free = (cell_types == CellType.FREE.value).astype(np.uint8)
+        header.components = cv2.connectedComponents(free, connectivity=4)[0] - 1
+    with open(map_file_path, "wb") as f:
+        f.write(header.to_bytes())
+        cell_types.tofile(f)
+
+
 def save_map_to_text_file(map_to_save: Map, txt_file_path: str, sep: str = ",") -> None:
     np.savetxt(txt_file_path, map_to_save.to_numpy(), delimiter=sep, fmt="%d")
 
@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
 from typing import Type
 
+import numpy as np
+
 from src.core.map import Map
 from src.core.uav import UAV
+from src.planner.cpp.single.planner import PlanPool, get_plan_options
+from src.planner.cpp.utils import map_to_assignment_matrix
 
 
 class UAVChangeHandler(ABC):
@@ -11,11 +15,27 @@ class UAVChangeHandler(ABC):
     def __init__(self, uavs: list[UAV], _map: Map, **kwargs):
         self.uavs = uavs
         self.map = _map
+        self.single_planner_name = kwargs.get("single_planner_name", "STC")
+        self.plan_pool = PlanPool(self.single_planner_name, **get_plan_options(kwargs))
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
         UAVChangeHandlerFactory.register(cls.name, cls)
 
+    def _get_assignment_matrix(self) -> np.ndarray:
+        """
+        Get a copy of the assignment matrix of the map, labeled by the index of each uav.
+        Handlers change the copy and give it back with `set_assignment_matrix`, so the map never
+        holds labels of uavs it does not know about if they fail halfway.
+        """
+        return map_to_assignment_matrix(self.map, self.uavs).copy()
+
+    def _plan_uavs(self) -> None:
+        """
+        Plan the trajectory of every uav over the cells assigned to it on the map
+        """
+        self.plan_pool.plan(self.map, self.uavs)
+
     @abstractmethod
     def handle_new_uav(self, uav: UAV) -> None:
         pass
@@ -24,6 +44,12 @@ class UAVChangeHandler(ABC):
     def handle_removed_uav(self, uav: UAV) -> None:
         pass
 
+    def close(self) -> None:
+        """
+        Release the resources kept between changes, e.g. worker processes
+        """
+        self.plan_pool.close()
+
 
 class UAVChangeHandlerFactory:
     _registry: dict[str, Type[UAVChangeHandler]] = {}
@@ -28,4 +28,7 @@ class RedistributeHandler(UAVChangeHandler):
             self.map,
             **self.kwargs,
         )
-        multi_planner.plan()
+        try:
+            multi_planner.plan()
+        finally:
+            multi_planner.close()
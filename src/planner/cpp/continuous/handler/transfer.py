@@ -3,11 +3,10 @@ import numpy as np
 from src.core.map import Map
 from src.core.uav import UAV
 from src.planner.cpp.continuous.handler.base import UAVChangeHandler
-from src.planner.cpp.single.planner import SingleCoveragePathPlannerFactory
 from src.planner.cpp.utils import (
+    PartitionState,
     get_partition,
     transfer_area_subtree,
-    map_to_assignment_matrix,
     get_neighbors,
 )
 
@@ -18,11 +17,10 @@ class TransferHandler(UAVChangeHandler):
     def __init__(self, uavs: list[UAV], _map: Map, **kwargs):
         super().__init__(uavs, _map, **kwargs)
 
-        self.single_planner_name = kwargs.get("single_planner_name", "STC")
         self.max_iter = kwargs.get("max_iter", 100)
 
     def handle_new_uav(self, uav: UAV):
-        assigned = map_to_assignment_matrix(self.map, self.uavs)
+        assigned = self._get_assignment_matrix()
         assigned[uav.r, uav.c] = len(self.uavs)
         self.uavs.append(uav)
         self._reassign(assigned)
@@ -32,7 +30,7 @@ class TransferHandler(UAVChangeHandler):
         uav_index = self.uavs.index(uav)
 
         # Transfer all cells assigned to uav to the uav with minimal number of cells
-        assigned = map_to_assignment_matrix(self.map, self.uavs)
+        assigned = self._get_assignment_matrix()
         partition = get_partition(assigned, num_uavs)
         neighbors = get_neighbors(assigned, partition[uav_index])
 
@@ -45,35 +43,24 @@ class TransferHandler(UAVChangeHandler):
 
     def _reassign(self, assignment_matrix: np.ndarray) -> None:
         self._transfer(assignment_matrix)
-        for i, uav in enumerate(self.uavs):
-            row_idx, col_idx = np.where(assignment_matrix == i)
-            for r, c in zip(row_idx, col_idx):
-                self.map.assign(r, c, uav)
-
-        for uav in self.uavs:
-            single_planner = SingleCoveragePathPlannerFactory.get_planner(
-                self.single_planner_name,
-                self.map,
-                uav,
-            )
-            single_planner.plan()
+        self.map.set_assignment_matrix(assignment_matrix, self.uavs)
+
+        self._plan_uavs()
 
     def _transfer(self, assigned: np.ndarray) -> None:
         """Modify assigned inplace"""
         num_uavs = len(self.uavs)
-        target_cell_count = len(self.map.free_cells) // num_uavs
+        target_cell_count = self.map.free_cell_count // num_uavs
+        partition = PartitionState(assigned, num_uavs)
         equal = False
         iteration = 0
         while (not equal) and iteration < self.max_iter:
             equal = True
-            partition = get_partition(assigned, num_uavs)
-            for node in sorted(range(num_uavs), key=lambda x: len(partition[x])):
-                neighbors = get_neighbors(assigned, partition[node])
-                for target_node in sorted(
-                    neighbors, key=lambda x: len(partition[x]), reverse=True
-                ):
-                    buyer = len(partition[node])
-                    seller = len(partition[target_node])
+            for node in sorted(range(num_uavs), key=partition.count):
+                neighbors = partition.neighbors(node)
+                for target_node in sorted(neighbors, key=partition.count, reverse=True):
+                    buyer = partition.count(node)
+                    seller = partition.count(target_node)
                     diff = seller - buyer
                     if diff < 1 or (diff == 1 and seller == target_cell_count + 1):
                         continue
@@ -85,7 +72,7 @@ class TransferHandler(UAVChangeHandler):
                         node,
                         neighbors[target_node],
                         to_transfer,
-                        assigned,
+                        partition,
                         init_pos,  # type: ignore
                     )
                     if not transferred:
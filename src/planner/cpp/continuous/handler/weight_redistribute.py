@@ -5,16 +5,15 @@ import numpy as np
 from src.core.map import Map
 from src.core.uav import UAV
 from src.planner.cpp.continuous.handler.base import UAVChangeHandler
-from src.planner.cpp.single.planner import SingleCoveragePathPlannerFactory
+from src.planner.cpp.scheduler import TransferScheduler
 from src.planner.cpp.utils import (
-    transfer_area_subtree,
-    map_to_assignment_matrix,
+    transfer_area_between,
     construct_adj_list,
     dfs_weighted_tree,
     get_assign_count,
     get_partition,
     get_neighbors,
-    get_adjacent_cells,
+    iter_post_order,
 )
 
 
@@ -24,10 +23,11 @@ class WeightedRedistributeHandler(UAVChangeHandler):
     def __init__(self, uavs: list[UAV], _map: Map, **kwargs):
         super().__init__(uavs, _map, **kwargs)
 
-        self.single_planner_name = kwargs.get("single_planner_name", "STC")
+        self.transfer_workers = kwargs.get("transfer_workers", None)
+        self.scheduler = TransferScheduler(self.transfer_workers)
 
     def handle_new_uav(self, uav: UAV):
-        assigned = map_to_assignment_matrix(self.map, self.uavs)
+        assigned = self._get_assignment_matrix()
         self.uavs.append(uav)
         num_uavs = len(self.uavs)
         assigned[uav.r, uav.c] = num_uavs - 1
@@ -39,7 +39,7 @@ class WeightedRedistributeHandler(UAVChangeHandler):
         uav_index = self.uavs.index(uav)
 
         # Transfer all cells assigned to uav to the uav with minimal number of cells
-        assigned = map_to_assignment_matrix(self.map, self.uavs)
+        assigned = self._get_assignment_matrix()
         partition = get_partition(assigned, num_uavs)
         neighbors = get_neighbors(assigned, partition[uav_index])
 
@@ -53,24 +53,19 @@ class WeightedRedistributeHandler(UAVChangeHandler):
         self._transfer_top_down(assigned, transfer_to)
         self._reassign(assigned)
 
+    def close(self) -> None:
+        self.scheduler.close()
+        super().close()
+
     def _reassign(self, assignment_matrix: np.ndarray) -> None:
-        for i, uav in enumerate(self.uavs):
-            row_idx, col_idx = np.where(assignment_matrix == i)
-            for r, c in zip(row_idx, col_idx):
-                self.map.assign(r, c, uav)
-
-        for uav in self.uavs:
-            single_planner = SingleCoveragePathPlannerFactory.get_planner(
-                self.single_planner_name,
-                self.map,
-                uav,
-            )
-            single_planner.plan()
+        self.map.set_assignment_matrix(assignment_matrix, self.uavs)
+
+        self._plan_uavs()
 
     def _transfer_top_down(self, assigned: np.ndarray, changed_uav_idx: int) -> None:
         """Modify `assigned` inplace"""
         num_uavs = len(self.uavs)
-        target_cell_count = len(self.map.free_cells) / num_uavs
+        target_cell_count = self.map.free_cell_count / num_uavs
 
         adj_list = construct_adj_list(assigned)
         assign_count = get_assign_count(assigned, num_uavs)
@@ -85,32 +80,15 @@ class WeightedRedistributeHandler(UAVChangeHandler):
         q = deque([changed_uav_idx])
         while q:
             u = q.popleft()
-            for v in sorted(tree_adj_list[u], key=diff):
-                transfer_amount = diff(v)
-                if transfer_amount < 0:
-                    transfer_area_subtree(
-                        v,
-                        u,
-                        get_adjacent_cells(assigned, v, u),
-                        -transfer_amount,
-                        assigned,
-                        (self.uavs[v].r, self.uavs[v].c),  # type: ignore
-                    )
-                else:
-                    transfer_area_subtree(
-                        u,
-                        v,
-                        get_adjacent_cells(assigned, u, v),
-                        transfer_amount,
-                        assigned,
-                        (self.uavs[u].r, self.uavs[u].c),  # type: ignore
-                    )
+            for v in sorted(tree_adj_list[u].tolist(), key=diff):
+                self._submit_transfer(u, v, diff(v))
                 q.append(v)
+        self.scheduler.run(assigned)
 
     def _transfer_bottom_up(self, assigned: np.ndarray, changed_uav_idx: int) -> None:
         """Modify `assigned` inplace"""
         num_uavs = len(self.uavs)
-        target_cell_count = len(self.map.free_cells) / num_uavs
+        target_cell_count = self.map.free_cell_count / num_uavs
 
         adj_list = construct_adj_list(assigned)
         assign_count = get_assign_count(assigned, num_uavs)
@@ -122,27 +100,19 @@ class WeightedRedistributeHandler(UAVChangeHandler):
             nonlocal target_cell_count
             return round(target_cell_count * count) - weight
 
-        def handle(node: int):
-            for neigh in sorted(tree_adj_list[node], key=diff):
-                handle(neigh)
-                transfer_amount = diff(neigh)
-                if transfer_amount < 0:
-                    transfer_area_subtree(
-                        neigh,
-                        node,
-                        get_adjacent_cells(assigned, neigh, node),
-                        -transfer_amount,
-                        assigned,
-                        (self.uavs[neigh].r, self.uavs[neigh].c),  # type: ignore
-                    )
-                else:
-                    transfer_area_subtree(
-                        node,
-                        neigh,
-                        get_adjacent_cells(assigned, node, neigh),
-                        transfer_amount,
-                        assigned,
-                        (self.uavs[node].r, self.uavs[node].c),  # type: ignore
-                    )
-
-        handle(changed_uav_idx)
+        # Balance every subtree before the edge to its parent
+        for neigh, node in iter_post_order(tree_adj_list, changed_uav_idx, diff):
+            self._submit_transfer(node, neigh, diff(neigh))
+        self.scheduler.run(assigned)
+
+    def _submit_transfer(self, parent: int, child: int, amount: int) -> None:
+        """Transfer `amount` cells from parent to child, or from child to parent if negative"""
+        sender, receiver = (child, parent) if amount < 0 else (parent, child)
+        self.scheduler.submit(
+            (sender, receiver),
+            transfer_area_between,
+            sender,
+            receiver,
+            abs(amount),
+            init_seller_pos=(self.uavs[sender].r, self.uavs[sender].c),
+        )
@@ -14,6 +14,9 @@ class ContinuousCoveragePathPlanner:
     ):
         self.uavs = uavs
         self.map = _map
+        # Movement history of UAVs joining later, see `MovementHistory`
+        self.history_capacity = kwargs.get("history_capacity", None)
+        self.history_stride = kwargs.get("history_stride", 1)
         for uav in self.uavs:
             self.allocate_initial_uav_position(uav)
         self.multi_planner = MultiCoveragePathPlannerFactory.get_planner(
@@ -27,7 +30,11 @@ class ContinuousCoveragePathPlanner:
         self.multi_planner.plan()
 
     def handle_new_uav(self, uav_name: str):
-        uav = UAV(name=uav_name)
+        uav = UAV(
+            name=uav_name,
+            history_capacity=self.history_capacity,
+            history_stride=self.history_stride,
+        )
         self.allocate_initial_uav_position(uav)
         self.handler.handle_new_uav(uav)
 
@@ -37,13 +44,17 @@ class ContinuousCoveragePathPlanner:
             raise ValueError(f"UAV {uav_name} not found")
         self.handler.handle_removed_uav(uav)
 
+    def close(self) -> None:
+        self.multi_planner.close()
+        self.handler.close()
+
     def allocate_initial_uav_position(self, new_uav: UAV) -> None:
         if new_uav.r is not None and new_uav.c is not None:
             return
         uav_positions = [(uav.r, uav.c) for uav in self.uavs]
         while True:
             free_cell = random.choice(self.map.free_cells)
-            if free_cell in uav_positions:
+            if free_cell.coordinate in uav_positions:
                 continue
             new_uav.r = free_cell.r
             new_uav.c = free_cell.c
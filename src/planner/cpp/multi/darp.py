@@ -24,10 +24,11 @@ class DARP(MultiAsSingleCoveragePathPlanner):
     def __init__(self, uavs: list[UAV], _map: Map, **kwargs):
         super().__init__(uavs, _map, **kwargs)
 
-        occupied_cells = _map.occupied_cells
         self.occupied_indices = np.array(
-            [(cell.r, cell.c) for cell in occupied_cells]
-        ).T
+            np.unravel_index(
+                np.sort(_map.occupied_cell_indices), (_map.height, _map.width)
+            )
+        )
 
         self.cost_matrix = np.stack(
             [
@@ -15,7 +15,7 @@ class MultiCoveragePathPlanner(ABC):
         self.num_uavs = len(uavs)
 
         self.free_cells = _map.free_cells
-        self.free_cell_count = len(_map.free_cells)
+        self.free_cell_count = _map.free_cell_count
         self.target_cell_count = self.free_cell_count // self.num_uavs
 
         self.uavs = uavs
@@ -26,7 +26,7 @@ class MultiCoveragePathPlanner(ABC):
         for uav in uavs:
             while uav.r is None or uav.c is None:
                 free_cell = random.choice(self.map.free_cells)
-                if free_cell in uav_positions:
+                if free_cell.coordinate in uav_positions:
                     continue
                 uav.r = free_cell.r
                 uav.c = free_cell.c
@@ -41,6 +41,11 @@ class MultiCoveragePathPlanner(ABC):
     def plan(self) -> None:
         pass
 
+    def close(self) -> None:
+        """
+        Release the resources kept between plans, e.g. worker processes
+        """
+
 
 class MultiCoveragePathPlannerFactory:
     _registry: dict[str, Type[MultiCoveragePathPlanner]] = {}
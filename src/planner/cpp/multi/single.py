@@ -5,7 +5,7 @@ import numpy as np
 from src.core.map import Map
 from src.core.uav import UAV
 from src.planner.cpp.multi.planner import MultiCoveragePathPlanner
-from src.planner.cpp.single.planner import SingleCoveragePathPlannerFactory
+from src.planner.cpp.single.planner import PlanPool, get_plan_options
 
 
 class MultiAsSingleCoveragePathPlanner(MultiCoveragePathPlanner, ABC):
@@ -19,6 +19,7 @@ class MultiAsSingleCoveragePathPlanner(MultiCoveragePathPlanner, ABC):
     def __init__(self, uavs: list[UAV], _map: Map, **kwargs):
         super().__init__(uavs, _map, **kwargs)
         self.single_planner_name = kwargs.get("single_planner", "STC")
+        self.plan_pool = PlanPool(self.single_planner_name, **get_plan_options(kwargs))
 
     @abstractmethod
     def assign(self) -> np.ndarray:
@@ -31,18 +32,12 @@ class MultiAsSingleCoveragePathPlanner(MultiCoveragePathPlanner, ABC):
 
     def plan(self) -> None:
         assignment_matrix = self.assign()
-        for i, uav in enumerate(self.uavs):
-            row_idx, col_idx = np.where(assignment_matrix == i)
-            for r, c in zip(row_idx, col_idx):
-                self.map.assign(r, c, uav)
-
-        for uav in self.uavs:
-            single_planner = SingleCoveragePathPlannerFactory.get_planner(
-                self.single_planner_name,
-                self.map,
-                uav,
-            )
-            single_planner.plan()
+        self.map.set_assignment_matrix(assignment_matrix, self.uavs)
+
+        self.plan_pool.plan(self.map, self.uavs)
+
+    def close(self) -> None:
+        self.plan_pool.close()
 
 
 class SingleAsMultiCoveragePathPlanner(MultiAsSingleCoveragePathPlanner):
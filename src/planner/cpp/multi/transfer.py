@@ -1,12 +1,16 @@
-from collections import deque
 from itertools import cycle
 
 import numpy as np
 
+from src.core.cell import CellType
 from src.core.map import Map
 from src.core.uav import UAV
 from src.planner.cpp.multi.single import MultiAsSingleCoveragePathPlanner
-from src.planner.cpp.utils import get_partition, transfer_area_subtree, get_neighbors
+from src.planner.cpp.utils import (
+    PartitionState,
+    transfer_area_subtree,
+    voronoi_partition,
+)
 
 _DIRS = ((-1, 0), (0, -1), (0, 1), (1, 0))
 
@@ -16,6 +20,7 @@ class AreaTransferringPlanner(MultiAsSingleCoveragePathPlanner):
 
     def __init__(self, uavs: list[UAV], _map: Map, **kwargs):
         super().__init__(uavs, _map, **kwargs)
+        self.initial_assign = kwargs.get("initial_assign", "voronoi")
         self.assigned = self._initial_assign()
 
         self.single_planner_name = kwargs.get("single_planner_name", "STC")
@@ -24,20 +29,17 @@ class AreaTransferringPlanner(MultiAsSingleCoveragePathPlanner):
         self.consecutive_failures = 0
 
     def assign(self) -> np.ndarray:
+        partition = PartitionState(self.assigned, self.num_uavs)
         iteration = 0
         while iteration < self.max_iter:
-            partition = get_partition(self.assigned, self.num_uavs)
-
             node = next(self.uav_iter)
-            neighbors = get_neighbors(self.assigned, partition[node])
+            neighbors = partition.neighbors(node)
             success = False
-            for target_node in sorted(
-                neighbors, key=lambda x: len(partition[x]), reverse=True
-            ):
-                receiver_count = len(partition[node])
+            for target_node in sorted(neighbors, key=partition.count, reverse=True):
+                receiver_count = partition.count(node)
                 if receiver_count > self.target_cell_count:
                     continue
-                sender_count = len(partition[target_node])
+                sender_count = partition.count(target_node)
                 diff = sender_count - receiver_count
                 if diff < 1 or (diff == 1 and sender_count == self.target_cell_count + 1):
                     continue
@@ -49,7 +51,7 @@ class AreaTransferringPlanner(MultiAsSingleCoveragePathPlanner):
                     node,
                     neighbors[target_node],
                     to_transfer,
-                    self.assigned,
+                    partition,
                     init_pos,  # type: ignore
                 )
                 if transferred:
@@ -67,24 +69,25 @@ class AreaTransferringPlanner(MultiAsSingleCoveragePathPlanner):
         return self.assigned
 
     def _initial_assign(self) -> np.ndarray:
-        """Assign using BFS with sources at each UAV's initial position."""
-        q: deque[tuple[tuple[int, int], int]] = deque(
-            ((uav.r, uav.c), i + 1) for i, uav in enumerate(self.uavs)  # type: ignore
-        )  # type: ignore
-        assigned = -1 * self.map.to_numpy()
-        row, col = assigned.shape
-
-        while q:
-            (r, c), label = q.popleft()
-            if assigned[r, c] > 0:
-                continue
-            assigned[r, c] = label
-            for dr, dc in _DIRS:
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < row and 0 <= nc < col and assigned[nr, nc] == 0:
-                    q.append(((nr, nc), label))
-
-        return assigned - 1
+        """
+        Assign using BFS with sources at each UAV's initial position.
+        With `initial_assign="balanced"`, every region stops growing at its share of the free cells
+        and the other regions take the cells it leaves.
+        """
+        if self.initial_assign == "voronoi":
+            capacity = None
+        elif self.initial_assign == "balanced":
+            capacity = -(-self.free_cell_count // self.num_uavs)
+        else:
+            raise ValueError(f"Unsupported initial assignment {self.initial_assign}")
+        cell_types = self.map.to_numpy()
+        labels = voronoi_partition(
+            cell_types == CellType.FREE.value,
+            [(uav.r, uav.c) for uav in self.uavs],  # type: ignore
+            _DIRS,
+            capacity,
+        )
+        return np.where(labels >= 0, labels, -1 - cell_types.astype(int))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,149 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+PARALLEL_TRANSFER_MIN_CELLS = 20000  # Smaller matrices are transferred serially
+
+# View of the shared assignment matrix in a worker process
+_shared: np.ndarray | None = None
+_shared_memory: shared_memory.SharedMemory | None = None
+
+
+def schedule_batches(labels: list[set[int]]) -> list[list[int]]:
+    """
+    Group tasks into batches whose tasks touch pairwise disjoint labels.
+    A task goes to the batch after the last one touching any of its labels, so conflicting tasks
+    keep their order and running the batches one after another is the same as running the tasks in order.
+    :param labels: The labels touched by each task
+    :return: The indices of the tasks of each batch, in order
+    """
+    last_batch: dict[int, int] = {}
+    batches: list[list[int]] = []
+    for i, task_labels in enumerate(labels):
+        batch = max(
+            (last_batch[label] + 1 for label in task_labels if label in last_batch),
+            default=0,
+        )
+        if batch == len(batches):
+            batches.append([])
+        batches[batch].append(i)
+        for label in task_labels:
+            last_batch[label] = batch
+    return batches
+
+
+class TransferScheduler:
+    """
+    Runs area transfers on an assignment matrix, in parallel where they do not conflict.
+    Each task is called as `func(*args, assigned=matrix, **kwargs)` and must only read and write
+    the cells whose label is one of the labels it was submitted with.
+    Two transfers with no label in common touch disjoint cells, so they can run at the same time
+    on one matrix shared by the worker processes, and the result is the same as running every
+    task in submission order.
+    The worker processes and the shared matrix are created on the first parallel run and kept
+    until `close`, so the scheduler can be used as a context manager.
+    """
+
+    def __init__(self, workers: int | None = None):
+        """
+        :param workers: The number of worker processes, None, 0 or 1 runs the tasks serially
+        """
+        self.workers = workers or 1
+        self._tasks: list[tuple[set[int], Callable[..., Any], tuple, dict]] = []
+        self._pool: ProcessPoolExecutor | None = None
+        self._memory: shared_memory.SharedMemory | None = None
+        self._shared: np.ndarray | None = None
+
+    def __enter__(self) -> "TransferScheduler":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def submit(
+        self, labels: Iterable[int], func: Callable[..., Any], *args, **kwargs
+    ) -> None:
+        self._tasks.append((set(labels), func, args, kwargs))
+
+    def run(self, assigned: np.ndarray) -> list[Any]:
+        """
+        Run the submitted tasks, modifying `assigned` inplace.
+        Small matrices and batches of single tasks are run serially.
+        :return: The result of each task, in submission order
+        """
+        tasks, self._tasks = self._tasks, []
+        batches = schedule_batches([labels for labels, _, _, _ in tasks])
+        if (
+            self.workers <= 1
+            or assigned.size < PARALLEL_TRANSFER_MIN_CELLS
+            or all(len(batch) <= 1 for batch in batches)
+        ):
+            return [
+                func(*args, assigned=assigned, **kwargs)
+                for _, func, args, kwargs in tasks
+            ]
+
+        pool, shared = self._get_pool(assigned)
+        results: list[Any] = [None] * len(tasks)
+        shared[...] = assigned
+        for batch in batches:
+            if len(batch) == 1:
+                _, func, args, kwargs = tasks[batch[0]]
+                results[batch[0]] = func(*args, assigned=shared, **kwargs)
+                continue
+            futures = [
+                pool.submit(_run, tasks[i][1], tasks[i][2], tasks[i][3]) for i in batch
+            ]
+            for i, future in zip(batch, futures):
+                results[i] = future.result()
+        assigned[...] = shared
+        return results
+
+    def close(self) -> None:
+        """
+        Stop the worker processes and free the shared matrix
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._memory is not None:
+            self._shared = None
+            self._memory.close()
+            self._memory.unlink()
+            self._memory = None
+
+    def _get_pool(self, assigned: np.ndarray) -> tuple[ProcessPoolExecutor, np.ndarray]:
+        """
+        :return: The worker processes, attached to a shared matrix with the shape and type of `assigned`
+        """
+        if (
+            self._pool is None
+            or self._shared is None
+            or self._shared.shape != assigned.shape
+            or self._shared.dtype != assigned.dtype
+        ):
+            self.close()
+            self._memory = shared_memory.SharedMemory(
+                create=True, size=max(assigned.nbytes, 1)
+            )
+            self._shared = np.ndarray(
+                assigned.shape, dtype=assigned.dtype, buffer=self._memory.buf
+            )
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                initializer=_attach,
+                initargs=(self._memory.name, assigned.shape, assigned.dtype.str),
+            )
+        return self._pool, self._shared  # type: ignore
+
+
+def _attach(name: str, shape: tuple[int, ...], dtype: str) -> None:
+    global _shared, _shared_memory
+    _shared_memory = shared_memory.SharedMemory(name=name)
+    _shared = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_shared_memory.buf)
+
+
+def _run(func: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+    return func(*args, assigned=_shared, **kwargs)
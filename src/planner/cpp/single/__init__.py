@@ -1 +1,2 @@
 from src.planner.cpp.single.stc import STCPlanner
+from src.planner.cpp.single.boustrophedon import BoustrophedonPlanner
@@ -0,0 +1,288 @@
+import numpy as np
+
+from src.planner.cpp.single.planner import SingleCoveragePathPlanner
+from src.core.map import Map
+from src.core.uav import UAV
+
+
+class BoustrophedonPlanner(SingleCoveragePathPlanner):
+    """
+    Lawnmower coverage of the boustrophedon cells of the region.
+    Each column of the region is split into segments of consecutive free cells. Segments of
+    consecutive columns that only overlap each other belong to the same cell, so a cell has one
+    segment per column and is covered by sweeping its columns one after another.
+    Cells are visited in depth first order, moving between them through the cells on the way.
+    Columns are along the longest side of the region, to make fewer turns.
+    """
+
+    name = "Boustrophedon"
+
+    def __init__(self, area: Map, uav: UAV, **kwargs):
+        super().__init__(area, uav, **kwargs)
+        assigned_mask = self.assigned_mask
+        rows = np.flatnonzero(assigned_mask.any(axis=1))
+        cols = np.flatnonzero(assigned_mask.any(axis=0))
+        if not len(rows):
+            raise ValueError(f"{uav} has no assigned cells")
+        self.origin = (int(rows[0]), int(cols[0]))
+        free = assigned_mask[rows[0] : rows[-1] + 1, cols[0] : cols[-1] + 1]
+        # Sweep along rows instead of columns by planning on the transposed region
+        self.transposed = free.shape[1] > free.shape[0]
+        self.free = free.T if self.transposed else free
+        self.segments, self.cells, self.adj_list = _decompose(self.free)
+
+    def plan(self) -> None:
+        if self.uav.r is None or self.uav.c is None:
+            raise ValueError("UAV coordinates are not set")
+        start_pos = (self.uav.r - self.origin[0], self.uav.c - self.origin[1])
+        if self.transposed:
+            start_pos = start_pos[::-1]
+        start_cell = self._find_cell(start_pos)
+        if start_cell is None:
+            raise ValueError(f"{self.uav} is not in its assigned cells")
+
+        path = _Path(start_pos)
+        self._sweep(path, start_cell)
+        visited = {start_cell}
+        stack = [start_cell]
+        # The cells from the current position back to the top of the stack
+        route = [start_cell]
+        while stack:
+            neighbor = next(
+                (cell for cell in self.adj_list[stack[-1]] if cell not in visited),
+                None,
+            )
+            if neighbor is None:
+                stack.pop()
+                if stack:
+                    route.append(stack[-1])
+                continue
+            self._travel(path, route + [neighbor])
+            visited.add(neighbor)
+            stack.append(neighbor)
+            route = [neighbor]
+            self._sweep(path, neighbor)
+        if len(visited) != len(self.cells):
+            raise ValueError("Graph is disconnected")
+        # The trajectory is a cycle, it ends next to the start
+        self._travel(path, route, start_pos)
+
+        trajectory = path.to_array()
+        if len(trajectory) > 1:
+            trajectory = trajectory[:-1]
+        if self.transposed:
+            trajectory = trajectory[:, ::-1]
+        self.uav.update_trajectory(trajectory + np.array(self.origin, dtype=np.int32))
+
+    def _find_cell(self, pos: tuple[int, int]) -> int | None:
+        r, c = pos
+        if not (0 <= r < self.free.shape[0] and 0 <= c < self.free.shape[1]):
+            return None
+        if not self.free[r, c]:
+            return None
+        col, top, _ = self.segments
+        height = self.free.shape[0]
+        # The segment of the column that starts last above the position
+        segment = np.searchsorted(col * height + top, c * height + r, "right") - 1
+        return int(self.cells.labels[segment])
+
+    def _sweep(self, path: "_Path", cell: int) -> None:
+        """
+        Cover the cell column by column, from its end column closest to the current position.
+        The first column ends at its end furthest from the position, then the columns end at
+        their bottom and top in turn.
+        """
+        first, last = self.cells.columns(cell)
+        r, c = path.position
+        if abs(c - last) < abs(c - first):
+            first, last = last, first
+        _, tops, bottoms = self.cells.segments(cell, self.segments, first, last)
+        self._travel(path, [cell], (min(max(r, tops[0]), bottoms[0]), first))
+        r = path.position[0]
+        to_bottom = r - tops[0] < bottoms[0] - r
+        step = 1 if last >= first else -1
+        for i, (top, bottom) in enumerate(zip(tops, bottoms)):
+            if i:
+                # Move to the next column, inside both segments
+                r = min(max(r, top, tops[i - 1]), bottom, bottoms[i - 1])
+                path.vertical(r)
+                path.horizontal(step)
+            if to_bottom:
+                path.vertical(top)
+                path.vertical(bottom)
+            else:
+                path.vertical(bottom)
+                path.vertical(top)
+            r = path.position[0]
+            to_bottom = not to_bottom
+
+    def _travel(
+        self, path: "_Path", cells: list[int], target: tuple[int, int] | None = None
+    ) -> None:
+        """
+        Move through a chain of adjacent cells, starting in the first one
+        :param target: The position to reach in the last cell, None to stop on entering it
+        """
+        c = path.position[1]
+        corridor: list[tuple[int, int, int]] = []
+        for i, cell in enumerate(cells):
+            first, last = self.cells.columns(cell)
+            if i + 1 < len(cells):
+                # Adjacent cells are next to each other, left or right
+                right = self.cells.columns(cells[i + 1])[0] == last + 1
+                exit_col = last if right else first
+            else:
+                right = False
+                exit_col = c if target is None else target[1]
+            columns, tops, bottoms = self.cells.segments(
+                cell, self.segments, c, exit_col
+            )
+            corridor.extend(zip(columns.tolist(), tops.tolist(), bottoms.tolist()))
+            c = exit_col + (1 if right else -1)
+
+        r = path.position[0]
+        _, top, bottom = corridor[0]
+        for col, next_top, next_bottom in corridor[1:]:
+            r = min(max(r, top, next_top), bottom, next_bottom)
+            path.vertical(r)
+            path.horizontal(col - path.position[1])
+            top, bottom = next_top, next_bottom
+        if target is not None:
+            path.vertical(target[0])
+
+
+class _Cells:
+    """
+    Boustrophedon cells as chains of segments, one per column.
+    `order[offsets[i]:offsets[i + 1]]` are the segments of cell i, by column.
+    """
+
+    def __init__(self, labels: np.ndarray, n_cells: int):
+        self.labels = labels
+        self.order = np.argsort(labels, kind="stable")
+        self.offsets = np.zeros(n_cells + 1, dtype=np.intp)
+        np.cumsum(np.bincount(labels, minlength=n_cells), out=self.offsets[1:])
+        self.first_columns: list[int] = []
+        self.last_columns: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def columns(self, cell: int) -> tuple[int, int]:
+        return self.first_columns[cell], self.last_columns[cell]
+
+    def segments(
+        self,
+        cell: int,
+        segments: tuple[np.ndarray, np.ndarray, np.ndarray],
+        start: int,
+        end: int,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: The columns, tops and bottoms of the segments of the cell from column `start` to `end`
+        """
+        first = self.first_columns[cell]
+        offset = self.offsets[cell]
+        if start <= end:
+            index = self.order[offset + start - first : offset + end - first + 1]
+        else:
+            index = self.order[offset + end - first : offset + start - first + 1][::-1]
+        col, top, bottom = segments
+        return col[index], top[index], bottom[index]
+
+
+class _Path:
+    """
+    Path of 4-connected moves, built from vertical runs and horizontal steps
+    """
+
+    def __init__(self, start: tuple[int, int]):
+        self.position = start
+        self._rows: list[np.ndarray] = [np.array([start[0]])]
+        self._cols: list[np.ndarray] = [np.array([start[1]])]
+
+    def vertical(self, row: int) -> None:
+        r, c = self.position
+        if row == r:
+            return
+        step = 1 if row > r else -1
+        rows = np.arange(r + step, row + step, step)
+        self._rows.append(rows)
+        self._cols.append(np.full(len(rows), c))
+        self.position = (row, c)
+
+    def horizontal(self, offset: int) -> None:
+        r, c = self.position
+        if offset == 0:
+            return
+        step = 1 if offset > 0 else -1
+        cols = np.arange(c + step, c + offset + step, step)
+        self._rows.append(np.full(len(cols), r))
+        self._cols.append(cols)
+        self.position = (r, c + offset)
+
+    def to_array(self) -> np.ndarray:
+        path = np.empty((sum(len(rows) for rows in self._rows), 2), dtype=np.int32)
+        path[:, 0] = np.concatenate(self._rows)
+        path[:, 1] = np.concatenate(self._cols)
+        return path
+
+
+def _decompose(
+    free: np.ndarray,
+) -> tuple[tuple[np.ndarray, np.ndarray, np.ndarray], _Cells, list[list[int]]]:
+    """
+    Split the columns of the region into segments and group them into boustrophedon cells
+    :param free: The free cells of the region
+    :return: The column, top and bottom row of each segment, by column then row, the cells
+    and the sorted neighbors of each cell
+    """
+    height = free.shape[0]
+    padded = np.zeros((free.shape[1], height + 2), dtype=np.int8)
+    padded[:, 1:-1] = free.T
+    edges = np.diff(padded, axis=1)
+    col, top = np.nonzero(edges == 1)
+    bottom = np.nonzero(edges == -1)[1] - 1
+    n_segments = len(col)
+
+    # The segments of the next column overlapping a segment are a range of that column
+    key = col * height
+    lo = np.searchsorted(key + bottom, key + height + top, "left")
+    hi = np.searchsorted(key + top, key + height + bottom, "right")
+    out_degree = hi - lo
+    left = np.repeat(np.arange(n_segments), out_degree)
+    right = np.repeat(lo, out_degree) + _ranges(out_degree)
+    in_degree = np.bincount(right, minlength=n_segments)
+    # A segment continues the cell of the previous one when they only overlap each other
+    continued = out_degree == 1
+    continued[continued] = in_degree[lo[continued]] == 1
+    previous = np.arange(n_segments)
+    previous[lo[continued]] = np.flatnonzero(continued)
+
+    # Label each segment with the first segment of its chain, by pointer jumping
+    labels = previous
+    while True:
+        jumped = labels[labels]
+        if (jumped == labels).all():
+            break
+        labels = jumped
+    starts, labels = np.unique(labels, return_inverse=True)
+    cells = _Cells(labels, len(starts))
+    cells.first_columns = col[starts].tolist()
+    cells.last_columns = (col[starts] + np.diff(cells.offsets) - 1).tolist()
+
+    adj_list: list[set[int]] = [set() for _ in range(len(starts))]
+    left, right = labels[left], labels[right]
+    across = left != right
+    for u, v in zip(left[across].tolist(), right[across].tolist()):
+        adj_list[u].add(v)
+        adj_list[v].add(u)
+    return (col, top, bottom), cells, [sorted(neighbors) for neighbors in adj_list]
+
+
+def _ranges(lengths: np.ndarray) -> np.ndarray:
+    """
+    :return: The concatenation of `arange(length)` for each length
+    """
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths, lengths)
@@ -1,16 +1,33 @@
+import hashlib
 from abc import abstractmethod, ABC
-from typing import Type
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Type
+
+import numpy as np
 
 from src.core.uav import UAV
 from src.core.map import Map
+from src.planner.cpp.utils import even_bounding_box
+
+TRAJECTORY_CACHE_SIZE = 64 * 1024 * 1024  # Bytes
+PARALLEL_PLAN_MIN_CELLS = 20000  # Smaller maps are planned serially
 
 
 class SingleCoveragePathPlanner(ABC):
     name: str
 
     def __init__(self, area: Map, uav: UAV, **kwargs):
+        """
+        :param assigned_mask: The free cells assigned to `uav`, if the caller already has them
+        """
         self.area = area
         self.uav = uav
+        assigned_mask = kwargs.get("assigned_mask", None)
+        self.assigned_mask = (
+            area.get_assigned_mask(uav) if assigned_mask is None else assigned_mask
+        )
 
     def __init_subclass__(cls, **kwargs):
         SingleCoveragePathPlannerFactory.register(cls.name, cls)
@@ -21,18 +38,321 @@ class SingleCoveragePathPlanner(ABC):
         pass
 
 
+class TrajectoryCache:
+    """
+    Least recently used trajectories of single planners, bounded by the bytes they hold.
+    Trajectories are keyed by the content and position of the UAV region, the start position of
+    the UAV, the planner name and its options, so a UAV whose region did not change since it was
+    planned from the same position skips planning. Planners build their tree or sweep from the
+    start, so a trajectory planned from another position is not reused.
+    """
+
+    def __init__(self, cache_size: int = TRAJECTORY_CACHE_SIZE):
+        self.cache_size = cache_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._trajectories: OrderedDict[bytes, np.ndarray] = OrderedDict()
+
+    @staticmethod
+    def key(
+        name: str, mask: np.ndarray, position: tuple[int, int] | None, **kwargs
+    ) -> bytes:
+        """
+        :param mask: The free cells assigned to the UAV
+        :param position: The position the UAV starts from
+        """
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        key = hashlib.blake2b(f"{name}|{position}|{sorted(kwargs.items())}".encode())
+        if len(rows):
+            top, left = rows[0], cols[0]
+            mask = mask[top : rows[-1] + 1, left : cols[-1] + 1]
+            key.update(f"|{top},{left},{mask.shape}|".encode())
+            key.update(np.packbits(mask).tobytes())
+        return key.digest()
+
+    def get(self, key: bytes) -> np.ndarray | None:
+        """
+        :return: The trajectory, None if it is not cached
+        """
+        trajectory = self._trajectories.get(key, None)
+        if trajectory is None:
+            self.misses += 1
+            return None
+        self._trajectories.move_to_end(key)
+        self.hits += 1
+        return trajectory
+
+    def put(self, key: bytes, trajectory: np.ndarray) -> None:
+        if key in self._trajectories:
+            self.size -= self._entry_size(key, self._trajectories.pop(key))
+        size = self._entry_size(key, trajectory)
+        if size > self.cache_size:
+            return
+        self._trajectories[key] = trajectory
+        self.size += size
+        while self.size > self.cache_size:
+            old_key, old_trajectory = self._trajectories.popitem(last=False)
+            self.size -= self._entry_size(old_key, old_trajectory)
+
+    def clear(self) -> None:
+        self._trajectories.clear()
+        self.size = 0
+
+    @staticmethod
+    def _entry_size(key: bytes, trajectory: np.ndarray) -> int:
+        return len(key) + trajectory.nbytes
+
+    def __len__(self) -> int:
+        return len(self._trajectories)
+
+
+class _CachedPlanner:
+    """Creates and runs the planner only when the trajectory is not in the cache"""
+
+    def __init__(
+        self,
+        create_planner: Callable[[], SingleCoveragePathPlanner],
+        uav: UAV,
+        cache: TrajectoryCache,
+        key: bytes,
+    ):
+        self.create_planner = create_planner
+        self.uav = uav
+        self.cache = cache
+        self.key = key
+
+    def plan(self) -> None:
+        uav = self.uav
+        trajectory = self.cache.get(self.key)
+        if trajectory is not None:
+            uav.update_trajectory(trajectory)
+            return
+        self.create_planner().plan()
+        self.cache.put(self.key, uav.trajectory)  # type: ignore
+
+
 class SingleCoveragePathPlannerFactory:
     _registry: dict[str, Type[SingleCoveragePathPlanner]] = {}
 
     @classmethod
     def get_planner(
-        cls, name: str, area: Map, uav: UAV, **kwargs
+        cls,
+        name: str,
+        area: Map,
+        uav: UAV,
+        cache: TrajectoryCache | None = None,
+        **kwargs,
     ) -> SingleCoveragePathPlanner:
+        """
+        :param cache: Trajectory cache to skip planning regions that were already planned
+        """
         planner_cls = cls._registry.get(name, None)
         if planner_cls is None:
             raise ValueError(f"Planner {name} not found")
-        return planner_cls(area, uav, **kwargs)
+        if cache is None:
+            return planner_cls(area, uav, **kwargs)
+        mask = area.get_assigned_mask(uav)
+        key = TrajectoryCache.key(name, mask, _get_position(uav), **kwargs)
+        return _CachedPlanner(  # type: ignore
+            lambda: planner_cls(area, uav, assigned_mask=mask, **kwargs),
+            uav,
+            cache,
+            key,
+        )
 
     @classmethod
     def register(cls, name: str, planner: Type[SingleCoveragePathPlanner]):
         cls._registry[name] = planner
+
+
+def plan_uavs(
+    name: str,
+    area: Map,
+    uavs: list[UAV],
+    workers: int | None = None,
+    executor: str = "process",
+    cache: TrajectoryCache | None = None,
+    pool: Executor | None = None,
+    **kwargs,
+) -> None:
+    """
+    Plan the trajectory of every UAV over the cells assigned to it.
+    With several workers, each region is cropped to its bounding box and planned by a pool,
+    small maps and single UAVs are planned serially.
+    :param name: The single planner name
+    :param workers: The number of workers, None, 0 or 1 plans serially
+    :param executor: "process" for a process pool, "thread" for a thread pool
+    :param cache: Trajectory cache to skip planning regions that were already planned
+    :param pool: Pool to plan with instead of one created for this call, it is not shut down
+    """
+    if (
+        not workers
+        or workers <= 1
+        or len(uavs) <= 1
+        or area.free_cell_count < PARALLEL_PLAN_MIN_CELLS
+    ):
+        for uav in uavs:
+            SingleCoveragePathPlannerFactory.get_planner(
+                name, area, uav, cache=cache, **kwargs
+            ).plan()
+        return
+
+    jobs: list[tuple[UAV, np.ndarray, bytes | None]] = []
+    for uav in uavs:
+        mask = area.get_assigned_mask(uav)
+        key = None
+        if cache is not None:
+            key = TrajectoryCache.key(name, mask, _get_position(uav), **kwargs)
+            trajectory = cache.get(key)
+            if trajectory is not None:
+                uav.update_trajectory(trajectory)
+                continue
+        jobs.append((uav, mask, key))
+    if not jobs:
+        return
+
+    cell_types = area.to_numpy()
+    context = (
+        _get_executor(executor, min(workers, len(jobs)))
+        if pool is None
+        else nullcontext(pool)
+    )
+    with context as pool:
+        futures = [
+            pool.submit(
+                _plan_region, name, *_crop_region(area, cell_types, uav, mask), kwargs
+            )
+            for uav, mask, _ in jobs
+        ]
+        for (uav, _, key), future in zip(jobs, futures):
+            uav.update_trajectory(future.result())
+            if cache is not None:
+                cache.put(key, uav.trajectory)  # type: ignore
+
+
+class PlanPool:
+    """
+    Plans the trajectories of UAVs with `plan_uavs`, keeping the options of a planner or handler.
+    The worker pool is created on the first plan with several workers and kept until `close`,
+    so the pool can be used as a context manager.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        workers: int | None = None,
+        executor: str = "process",
+        cache: TrajectoryCache | None = None,
+        **kwargs,
+    ):
+        """
+        :param name: The single planner name
+        :param kwargs: The options of the single planner, see `plan_uavs` for the others
+        """
+        self.name = name
+        self.workers = workers
+        self.executor = executor
+        self.cache = cache
+        self.kwargs = kwargs
+        self._pool: Executor | None = None
+
+    def __enter__(self) -> "PlanPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def plan(self, area: Map, uavs: list[UAV]) -> None:
+        if self._pool is None and self.workers and self.workers > 1:
+            self._pool = _get_executor(self.executor, self.workers)
+        plan_uavs(
+            self.name,
+            area,
+            uavs,
+            self.workers,
+            self.executor,
+            self.cache,
+            self._pool,
+            **self.kwargs,
+        )
+
+    def close(self) -> None:
+        """
+        Stop the workers
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def _get_position(uav: UAV) -> tuple[int, int] | None:
+    return None if uav.r is None or uav.c is None else (uav.r, uav.c)
+
+
+def get_plan_options(kwargs: dict) -> dict:
+    """
+    Get the options of `plan_uavs` and `PlanPool` from the keyword arguments of a planner or handler:
+    `trajectory_cache`, `plan_workers`, `plan_executor` and `single_planner_options`
+    """
+    return {
+        "workers": kwargs.get("plan_workers", None),
+        "executor": kwargs.get("plan_executor", "process"),
+        "cache": kwargs.get("trajectory_cache", None),
+        **kwargs.get("single_planner_options", {}),
+    }
+
+
+def _get_executor(executor: str, workers: int) -> Executor:
+    if executor == "process":
+        return ProcessPoolExecutor(workers)
+    if executor == "thread":
+        return ThreadPoolExecutor(workers)
+    raise ValueError(f"Unsupported executor {executor}")
+
+
+def _crop_region(
+    area: Map, cell_types: np.ndarray, uav: UAV, mask: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, tuple[int, int], tuple[int, int] | None]:
+    """
+    Crop the region of the UAV and its position to their bounding box, with even corners
+    so that 2x2 blocks of cells stay the same.
+    :param mask: The free cells assigned to the UAV
+    :return: The cell types and the region mask in the box, the box origin, the position in the box
+    """
+    position = _get_position(uav)
+    (top, left), (bottom, right) = even_bounding_box(
+        mask, (uav.r, uav.c), (area.height, area.width)
+    )
+    box = slice(top, bottom), slice(left, right)
+    if position is not None:
+        position = (position[0] - top, position[1] - left)
+    return cell_types[box], mask[box], (top, left), position
+
+
+def _plan_region(
+    name: str,
+    cell_types: np.ndarray,
+    mask: np.ndarray,
+    origin: tuple[int, int],
+    position: tuple[int, int] | None,
+    kwargs: dict,
+) -> np.ndarray:
+    """
+    Plan a cropped region in a worker
+    :return: The trajectory in the coordinates of the whole map
+    """
+    region = Map(cell_types)
+    uav = UAV(
+        name="region",
+        r=None if position is None else position[0],
+        c=None if position is None else position[1],
+        has_color=False,
+        history_capacity=0,
+    )
+    region.set_assignment_matrix(np.where(mask, 0, -1), [uav])
+    SingleCoveragePathPlannerFactory.get_planner(
+        name, region, uav, assigned_mask=mask, **kwargs
+    ).plan()
+    return uav.trajectory + np.array(origin, dtype=np.int32)  # type: ignore
@@ -1,7 +1,10 @@
 from collections import defaultdict
 
-from src.core.cell import Cell, CellType
+import numpy as np
+
+from src.core.cell import CellType
 from src.planner.cpp.single.planner import SingleCoveragePathPlanner
+from src.planner.cpp.utils import DisjointSet, even_bounding_box
 from src.core.map import Map
 from src.core.uav import UAV
 
@@ -13,22 +16,24 @@ class STCPlanner(SingleCoveragePathPlanner):
         super().__init__(area, uav, **kwargs)
         # Apply uav's name as a mask to the area
         # Only cells assigned the same name as the uav will be considered as free, otherwise occupied
-        assignee = uav.name
-        cells = []
-        for cell_row in area.cells:
-            row = []
-            for cell in cell_row:
-                if cell.cell_type == CellType.FREE and cell.assign == assignee:
-                    row.append(Cell(CellType.FREE, cell.r, cell.c))
-                else:
-                    row.append(Cell(CellType.OCCUPIED, cell.r, cell.c))
-            cells.append(row)
+        assigned_mask = self.assigned_mask
+        # Plan on the bounding box of the region, cropped along mega cells.
+        # The rows and columns left out of mega cells by an odd map size stay out.
+        height, width = assigned_mask.shape
+        self.origin, end = even_bounding_box(
+            assigned_mask, (uav.r, uav.c), (height & ~1, width & ~1)
+        )
+        assigned_mask = assigned_mask[self.origin[0] : end[0], self.origin[1] : end[1]]
         mst_algo = f'_{kwargs.get("mst_algo", "kruskal")}'
         if not hasattr(self, mst_algo):
             raise KeyError(f"Unsupported MST algorithm {mst_algo}")
         self.mst_algo = getattr(self, mst_algo)
-        self.area = Map(cells)
         self.dirs = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+        mega_free, mega_links = _build_mega_graph(assigned_mask, self.dirs)
+        self.free = assigned_mask
+        self.mega_free = mega_free
+        self.mega_links = mega_links
+        self._mega_links_rows: list[list[int]] = mega_links.tolist()
 
     @staticmethod
     def _cell_to_mega_cell(cell: tuple[int, int]) -> tuple[int, int]:
@@ -37,101 +42,62 @@ class STCPlanner(SingleCoveragePathPlanner):
     def plan(self) -> None:
         if self.uav.r is None or self.uav.c is None:
             raise ValueError("UAV coordinates are not set")
-        height, width = self.area.height, self.area.width
-        start_pos = (self.uav.r, self.uav.c)
-        coverage_path: list[tuple[int, int]] = [start_pos]
-        visited: set[tuple[int, int]] = {start_pos}
+        width = self.free.shape[1]
+        origin_r, origin_c = self.origin
+        start_pos = (self.uav.r - origin_r, self.uav.c - origin_c)
 
         adj_list = self.mst_algo(start_pos)
-
-        def is_valid_movement(
-            current: tuple[int, int],
-            direction: tuple[int, int],
-        ) -> bool:
-            current_r, current_c = current
-            dx, dy = direction
-            next_r, next_c = current_r + dx, current_c + dy
-            if next_r == -1 or next_r == height or next_c == -1 or next_c == width:
-                return False
-            _next = (next_r, next_c)
-            if _next in visited:
-                return False
-
-            current_mega_cell = self._cell_to_mega_cell(current)
-            next_mega_cell = self._cell_to_mega_cell(_next)
-            if current_mega_cell != next_mega_cell:
-                return next_mega_cell in adj_list[current_mega_cell]
-
-            def get_neighbor_mega_cell(
-                curr: tuple[int, int], nxt: tuple[int, int]
-            ) -> tuple[int, int]:
-                mega_r, mega_c = self._cell_to_mega_cell(curr)
-                current_and_next = {curr, nxt}
-                if current_and_next == {
-                    (mega_r << 1, mega_c << 1),
-                    (mega_r << 1, (mega_c << 1) + 1),
-                }:
-                    return mega_r - 1, mega_c
-                if current_and_next == {
-                    (mega_r << 1, mega_c << 1),
-                    ((mega_r << 1) + 1, mega_c << 1),
-                }:
-                    return mega_r, mega_c - 1
-                if current_and_next == {
-                    ((mega_r << 1) + 1, mega_c << 1),
-                    ((mega_r << 1) + 1, (mega_c << 1) + 1),
-                }:
-                    return mega_r + 1, mega_c
-
-                return mega_r, mega_c + 1
-
-            neighbor_mega_cell = get_neighbor_mega_cell(current, _next)
-            return not (neighbor_mega_cell in adj_list[current_mega_cell])
-
-        current_pos = start_pos
+        tables = _build_contour_tables(self.free.shape, adj_list, self.dirs)
+        next_a, dir_a, next_b, dir_b, crossing, symmetric = tables
+        free = self.free.ravel().tolist()
+
+        # Walk around the spanning tree, visiting each sub cell of its mega cells once.
+        # Every sub cell has two neighbors on the contour: the walk starts towards the one in the
+        # first direction and then always moves to the one it does not come from.
+        current = start_pos[0] * width + start_pos[1]
+        previous = next_a[current] if dir_a[current] > dir_b[current] else -1
+        steps = 4 * max(len(adj_list), 1) - 1
+        coverage_path = [0] * (2 * steps + 1)
+        coverage_path[0] = current
+        size = 1
         is_symmetric = False
-        stop = False
-        while not stop:
-            stop = True
-            for d in self.dirs:
-                if is_valid_movement(current_pos, d):
-                    next_pos = (current_pos[0] + d[0], current_pos[1] + d[1])
-                    visited.add(next_pos)
-                    last_coverage_pos = coverage_path[-1]
-                    if is_symmetric or last_coverage_pos == current_pos:
-                        if self._cell_to_mega_cell(
-                            current_pos
-                        ) == self._cell_to_mega_cell(next_pos):
-                            if self.area.get_cell(*next_pos).cell_type == CellType.FREE:
-                                coverage_path.append(next_pos)
-                                is_symmetric = False
-                            else:
-                                symmetric_cell = self._symmetric_cell(next_pos, d)
-                                if (
-                                    self.area.get_cell(*symmetric_cell).cell_type
-                                    == CellType.FREE
-                                ):
-                                    coverage_path.append(symmetric_cell)
-                                is_symmetric = True
-                        else:
-                            symmetric_cell = self._symmetric_cell(current_pos, d)
-                            if is_symmetric and symmetric_cell != last_coverage_pos:
-                                coverage_path.append(symmetric_cell)
-                            if self.area.get_cell(*next_pos).cell_type == CellType.FREE:
-                                coverage_path.append(next_pos)
-                                is_symmetric = False
-                            else:
-                                coverage_path.append(self._symmetric_cell(next_pos, d))
-                                is_symmetric = True
-
-                    current_pos = next_pos
-                    stop = False
-                    break
-
-        coverage_trajectory = [
-            self.area.get_cell(*pos) for pos in _deduplicate_path(coverage_path)
-        ]
-        self.uav.update_trajectory(coverage_trajectory)
+        for _ in range(steps):
+            if next_a[current] == previous:
+                nxt, d = next_b[current], dir_b[current]
+            else:
+                nxt, d = next_a[current], dir_a[current]
+            last_coverage_pos = coverage_path[size - 1]
+            if is_symmetric or last_coverage_pos == current:
+                if not crossing[current] >> d & 1:
+                    if free[nxt]:
+                        coverage_path[size] = nxt
+                        size += 1
+                        is_symmetric = False
+                    else:
+                        symmetric_cell = symmetric[d][nxt]
+                        if free[symmetric_cell]:
+                            coverage_path[size] = symmetric_cell
+                            size += 1
+                        is_symmetric = True
+                else:
+                    symmetric_cell = symmetric[d][current]
+                    if is_symmetric and symmetric_cell != last_coverage_pos:
+                        coverage_path[size] = symmetric_cell
+                        size += 1
+                    if free[nxt]:
+                        coverage_path[size] = nxt
+                        is_symmetric = False
+                    else:
+                        coverage_path[size] = symmetric[d][nxt]
+                        is_symmetric = True
+                    size += 1
+            previous, current = current, nxt
+
+        path = _deduplicate_path(np.array(coverage_path[:size], dtype=np.intp))
+        trajectory = np.empty((len(path), 2), dtype=np.int32)
+        trajectory[:, 0] = path // width + origin_r
+        trajectory[:, 1] = path % width + origin_c
+        self.uav.update_trajectory(trajectory)
 
     def _kruskal(
         self, start_cell: tuple[int, int]
@@ -142,58 +108,31 @@ class STCPlanner(SingleCoveragePathPlanner):
         :return: Adjacency list of the MST in the mega graph
         """
 
-        class UnionFind:
-            def __init__(self, free_cells: list[tuple[int, int]]):
-                self.parents = {free_cell: free_cell for free_cell in free_cells}
-                self.ranks = {free_cell: 0 for free_cell in free_cells}
-                self.n_components = len(free_cells)
-
-            def find(self, cell: tuple[int, int]) -> tuple[int, int]:
-                if self.parents[cell] != cell:
-                    self.parents[cell] = self.find(self.parents[cell])
-                return self.parents[cell]
-
-            def union(self, cell1: tuple[int, int], cell2: tuple[int, int]) -> bool:
-                root1, root2 = self.find(cell1), self.find(cell2)
-                if root1 == root2:
-                    return False
-                if self.ranks[root1] < self.ranks[root2]:
-                    root1, root2 = root2, root1
-                self.parents[root2] = root1
-                self.ranks[root1] += self.ranks[root1] == self.ranks[root2]
-                self.n_components -= 1
-                return True
-
         start_mega_cell = self._cell_to_mega_cell(start_cell)
         assert self._mega_cell_type(start_mega_cell) == CellType.FREE
 
-        all_free_mega_cells: list[tuple[int, int]] = []
-        for r in range(self.area.height >> 1):
-            for c in range(self.area.width >> 1):
-                if self._mega_cell_type((r, c)) == CellType.FREE:
-                    all_free_mega_cells.append((r, c))
-
-        uf = UnionFind(all_free_mega_cells)
+        width = self.mega_free.shape[1]
+        uf = DisjointSet(self.mega_free.size)
+        n_components = int(np.count_nonzero(self.mega_free))
         adj_list = defaultdict(list)
-        for mega_cell in all_free_mega_cells:
-            neighbors, _ = self._neighbor(mega_cell)
-            for neighbor in neighbors:
-                if uf.union(mega_cell, neighbor):
-                    adj_list[mega_cell].append(neighbor)
-                    adj_list[neighbor].append(mega_cell)
-                    if uf.n_components == 1:
-                        return adj_list
-
-        for mega_cell in all_free_mega_cells:
-            _, secondary_neighbors = self._neighbor(mega_cell)
-            for secondary_neighbor in secondary_neighbors:
-                if uf.union(mega_cell, secondary_neighbor):
-                    adj_list[mega_cell].append(secondary_neighbor)
-                    adj_list[secondary_neighbor].append(mega_cell)
-                    if uf.n_components == 1:
-                        return adj_list
-
-        if uf.n_components == 1:
+        # Neighbors first, then secondary neighbors. Once the free mega cells are connected,
+        # no other link can join two sets
+        for bit_offset in (0, 4):
+            if n_components == 1:
+                break
+            mega_cells, neighbors = _mega_edges(self.mega_links, self.dirs, bit_offset)
+            merged = uf.union_all(mega_cells, neighbors)
+            n_components -= len(merged)
+            mega_cells = np.array(mega_cells, dtype=np.intp)[merged]
+            neighbors = np.array(neighbors, dtype=np.intp)[merged]
+            for mega_cell, neighbor in zip(
+                zip(*(x.tolist() for x in np.divmod(mega_cells, width))),
+                zip(*(x.tolist() for x in np.divmod(neighbors, width))),
+            ):
+                adj_list[mega_cell].append(neighbor)
+                adj_list[neighbor].append(mega_cell)
+
+        if n_components == 1:
             return adj_list
         raise ValueError("Graph is disconnected")
 
@@ -228,22 +167,6 @@ class STCPlanner(SingleCoveragePathPlanner):
                 adj_list[parent].append(mega_cell)
         return adj_list
 
-    def _top_left(self, mega_cell_coordinate: tuple[int, int]) -> Cell:
-        r, c = mega_cell_coordinate
-        return self.area.get_cell(r << 1, c << 1)
-
-    def _top_right(self, mega_cell_coordinate: tuple[int, int]) -> Cell:
-        r, c = mega_cell_coordinate
-        return self.area.get_cell(r << 1, (c << 1) + 1)
-
-    def _bottom_left(self, mega_cell_coordinate: tuple[int, int]) -> Cell:
-        r, c = mega_cell_coordinate
-        return self.area.get_cell((r << 1) + 1, c << 1)
-
-    def _bottom_right(self, mega_cell_coordinate: tuple[int, int]) -> Cell:
-        r, c = mega_cell_coordinate
-        return self.area.get_cell((r << 1) + 1, (c << 1) + 1)
-
     def _neighbor(
         self, mega_cell: tuple[int, int]
     ) -> tuple[list[tuple[int, int]], list[tuple[int, int]]]:
@@ -258,125 +181,144 @@ class STCPlanner(SingleCoveragePathPlanner):
         :param mega_cell: Current mega cell
         :return: neighbors and secondary neighbors
         """
+        r, c = mega_cell
+        links = self._mega_links_rows[r][c]
         neighbors: list[tuple[int, int]] = []
         secondary_neighbors: list[tuple[int, int]] = []
-
-        def get_contacting_cells(
-            current_mega_cell: tuple[int, int], direction: tuple[int, int]
-        ) -> tuple[Cell, Cell]:
-            """
-            Get the two cells that are contacting the neighboring mega cell in the given direction
-            :param current_mega_cell: The current mega cell
-            :param direction: One of four directions (up, down, left, right)
-            :return: Two contacting cells
-            """
-            if direction == (-1, 0):
-                return self._top_left(current_mega_cell), self._top_right(
-                    current_mega_cell
-                )
-            if direction == (1, 0):
-                return self._bottom_left(current_mega_cell), self._bottom_right(
-                    current_mega_cell
-                )
-            if direction == (0, -1):
-                return self._top_left(current_mega_cell), self._bottom_left(
-                    current_mega_cell
-                )
-            if direction == (0, 1):
-                return self._top_right(current_mega_cell), self._bottom_right(
-                    current_mega_cell
-                )
-            raise ValueError(f"Invalid direction {direction}")
-
-        height, width = self.area.height >> 1, self.area.width >> 1
-        r, c = mega_cell
-        for dr, dc in self.dirs:
-            nxt_r, nxt_c = r + dr, c + dc
-            if nxt_r < 0 or nxt_r >= height or nxt_c < 0 or nxt_c >= width:
-                continue
-            if self._mega_cell_type((nxt_r, nxt_c)) == CellType.OCCUPIED:
-                continue
-            nxt = (nxt_r, nxt_c)
-            contacting_cells = get_contacting_cells(mega_cell, (dr, dc))
-            nxt_contacting_cells = (
-                self.area.get_cell(
-                    contacting_cells[0].r + dr, contacting_cells[0].c + dc
-                ),
-                self.area.get_cell(
-                    contacting_cells[1].r + dr, contacting_cells[1].c + dc
-                ),
-            )
-            if any(
-                cell1.cell_type == CellType.FREE and cell2.cell_type == CellType.FREE
-                for cell1, cell2 in zip(contacting_cells, nxt_contacting_cells)
-            ):
-                secondary_neighbors.append(nxt)
-            if all(
-                cell.cell_type == CellType.FREE
-                for cell in contacting_cells + nxt_contacting_cells
-            ):
-                neighbors.append(nxt)
+        for i, (dr, dc) in enumerate(self.dirs):
+            if links >> i & 1:
+                neighbors.append((r + dr, c + dc))
+            if links >> (i + 4) & 1:
+                secondary_neighbors.append((r + dr, c + dc))
         return neighbors, secondary_neighbors
 
     def _mega_cell_type(self, mega_cell: tuple[int, int]) -> CellType:
-        children_cells = [
-            self._top_left(mega_cell),
-            self._top_right(mega_cell),
-            self._bottom_left(mega_cell),
-            self._bottom_right(mega_cell),
-        ]
-
         # If any of the children cells is free, the mega cell is free
         # Otherwise, it is occupied
-        cell_type = CellType.OCCUPIED
-        for cell in children_cells:
-            if cell.cell_type == CellType.FREE:
-                cell_type = CellType.FREE
-                break
-        return cell_type
+        r, c = mega_cell
+        return CellType.FREE if self.mega_free[r, c] else CellType.OCCUPIED
 
-    def _symmetric_cell(
-        self, cell: tuple[int, int], direction: tuple[int, int]
-    ) -> tuple[int, int]:
-        """
-        The symmetric cell is defined as the cell that is symmetric to the current cell in its mega cell
-        with respect to the movement direction. There are two symmetric axes: vertical and horizontal.
-        vertical axis
-        :param cell: A cell in the original area
-        :param direction: One of four movements (up, down, left, right)
-        :return: The symmetric cell
-        """
-        mega_cell = self._cell_to_mega_cell(cell)
-        if direction == (-1, 0) or direction == (1, 0):  # Vertical
-            if cell == self._top_left(mega_cell).coordinate:
-                return self._top_right(mega_cell).coordinate
-            if cell == self._top_right(mega_cell).coordinate:
-                return self._top_left(mega_cell).coordinate
-            if cell == self._bottom_left(mega_cell).coordinate:
-                return self._bottom_right(mega_cell).coordinate
-            if cell == self._bottom_right(mega_cell).coordinate:
-                return self._bottom_left(mega_cell).coordinate
-        else:  # Horizontal
-            if cell == self._top_left(mega_cell).coordinate:
-                return self._bottom_left(mega_cell).coordinate
-            if cell == self._top_right(mega_cell).coordinate:
-                return self._bottom_right(mega_cell).coordinate
-            if cell == self._bottom_left(mega_cell).coordinate:
-                return self._top_left(mega_cell).coordinate
-            if cell == self._bottom_right(mega_cell).coordinate:
-                return self._top_right(mega_cell).coordinate
-
-        raise ValueError(f"Invalid cell {cell} and direction {direction}")
-
-
-def _deduplicate_path(path: list[tuple[int, int]]) -> list[tuple[int, int]]:
+
+def _build_mega_graph(
+    free: np.ndarray, dirs: list[tuple[int, int]]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Build the mega cell graph from the 2x2 blocks of the free mask.
+    :param free: The boolean mask of free cells
+    :param dirs: The four directions, in the order of the bits of the links
+    :return: Whether each mega cell is free, and the links of each mega cell: bit i is set if the
+             mega cell in direction `dirs[i]` is a neighbor, bit i + 4 if it is a secondary neighbor
+    """
+    height, width = free.shape[0] >> 1, free.shape[1] >> 1
+    # blocks[r, i, c, j] is the cell (i, j) of mega cell (r, c)
+    blocks = free[: height << 1, : width << 1].reshape(height, 2, width, 2)
+    mega_free = blocks.any(axis=(1, 3))
+
+    # Contacting cells of horizontally and vertically adjacent mega cells both free
+    horizontal = blocks[:, :, :-1, 1] & blocks[:, :, 1:, 0]
+    vertical = blocks[:-1, 1, :, :] & blocks[1:, 0, :, :]
+    pairs = {
+        (0, 1): (horizontal, 1, (slice(None), slice(None, -1))),
+        (0, -1): (horizontal, 1, (slice(None), slice(1, None))),
+        (1, 0): (vertical, 2, (slice(None, -1), slice(None))),
+        (-1, 0): (vertical, 2, (slice(1, None), slice(None))),
+    }
+    links = np.zeros((height, width), dtype=np.uint8)
+    for i, direction in enumerate(dirs):
+        contacts, axis, target = pairs[direction]
+        links[target] |= contacts.all(axis=axis).astype(np.uint8) << i
+        links[target] |= contacts.any(axis=axis).astype(np.uint8) << (i + 4)
+    return mega_free, links
+
+
+def _mega_edges(
+    links: np.ndarray, dirs: list[tuple[int, int]], bit_offset: int
+) -> tuple[list[int], list[int]]:
+    """
+    :param links: The links of each mega cell, see `_build_mega_graph`
+    :param dirs: The four directions, in the order of the bits of the links
+    :param bit_offset: 0 for the neighbors, 4 for the secondary neighbors
+    :return: The flat indices of the two mega cells of each link to a later mega cell,
+             ordered by the first mega cell then by direction
+    """
+    width = links.shape[1]
+    keys, ends = [], []
+    for i, (dr, dc) in enumerate(dirs):
+        r, c = np.nonzero((links >> (i + bit_offset)) & 1)
+        keys.append((r * width + c) * 4 + i)
+        ends.append((r + dr) * width + c + dc)
+    key, end = np.concatenate(keys), np.concatenate(ends)
+    # A link back to an earlier mega cell always joins two cells already joined by its reverse
+    forward = end > key >> 2
+    key, end = key[forward], end[forward]
+    order = np.argsort(key, kind="stable")
+    return (key[order] >> 2).tolist(), end[order].tolist()
+
+
+def _build_contour_tables(
+    shape: tuple[int, int],
+    adj_list: dict[tuple[int, int], list[tuple[int, int]]],
+    dirs: list[tuple[int, int]],
+) -> tuple[list[int], list[int], list[int], list[int], list[int], list[list[int]]]:
+    """
+    Transition tables of the walk around a spanning tree of mega cells, over flat cell indices.
+    A sub cell moves out of its mega cell towards a tree neighbor, or else along its mega cell.
+    Move `a` goes up or down out of the mega cell, or else sideways inside it,
+    move `b` goes left or right out of the mega cell, or else up or down inside it.
+    :param shape: The (height, width) of the area, both even
+    :param adj_list: The spanning tree of mega cells
+    :param dirs: The four directions, moves are given as their index in it
+    :return: The next cell and direction of move `a` then of move `b` of each cell,
+             the directions of the moves leaving the mega cell of each cell as bits,
+             and the symmetric cell of each cell for each direction
+    """
+    height, width = shape
+    right, down, left, up = (dirs.index(d) for d in [(0, 1), (1, 0), (0, -1), (-1, 0)])
+    tree_edges = np.zeros((height >> 1, width >> 1), dtype=np.uint8)
+    for (r, c), neighbors in adj_list.items():
+        for nr, nc in neighbors:
+            tree_edges[r, c] |= 1 << dirs.index((nr - r, nc - c))
+    tree_edges = tree_edges.repeat(2, axis=0).repeat(2, axis=1)
+
+    rows, cols = np.indices(shape)
+    top, leftmost = (rows & 1) == 0, (cols & 1) == 0
+    flat = (rows * width + cols).ravel()
+    offsets = np.zeros(4, dtype=np.intp)
+    offsets[[right, down, left, up]] = 1, width, -1, -width
+
+    out_a = np.where(top, up, down)
+    leaves_a = (tree_edges >> out_a) & 1 == 1
+    dir_a = np.where(leaves_a, out_a, np.where(leftmost, right, left)).ravel()
+    out_b = np.where(leftmost, left, right)
+    leaves_b = (tree_edges >> out_b) & 1 == 1
+    dir_b = np.where(leaves_b, out_b, np.where(top, down, up)).ravel()
+    crossing = (leaves_a << out_a) | (leaves_b << out_b)
+
+    # Moving up or down mirrors the column inside the mega cell, otherwise the row
+    symmetric = [[] for _ in dirs]
+    mirror_col = (flat ^ 1).tolist()
+    mirror_row = np.where(top.ravel(), flat + width, flat - width).tolist()
+    for d in (down, up):
+        symmetric[d] = mirror_col
+    for d in (right, left):
+        symmetric[d] = mirror_row
+
+    return (
+        (flat + offsets[dir_a]).tolist(),
+        dir_a.tolist(),
+        (flat + offsets[dir_b]).tolist(),
+        dir_b.tolist(),
+        crossing.ravel().tolist(),
+        symmetric,
+    )
+
+
+def _deduplicate_path(path: np.ndarray) -> np.ndarray:
     """
     Deduplicate the path by removing the consecutive duplicate cells
-    :param path: The path to deduplicate
+    :param path: The path to deduplicate, as flat cell indices
     :return: The deduplicated path
     """
-    deduplicated_path = [path[0]]
-    for i in range(1, len(path)):
-        if path[i] != path[i - 1]:
-            deduplicated_path.append(path[i])
-    return deduplicated_path
+    keep = np.ones(len(path), dtype=bool)
+    np.not_equal(path[1:], path[:-1], out=keep[1:])
+    return path[keep]
@@ -1,6 +1,6 @@
 import random
 from collections import defaultdict, deque
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Iterator
 
 import numpy as np
 
@@ -10,6 +10,8 @@ from src.core.uav import UAV
 random.seed(42069)
 _4_DIRS = ((-1, 0), (0, -1), (0, 1), (1, 0))
 _8_DIRS = ((-1, 0), (0, -1), (0, 1), (1, 0), (-1, -1), (-1, 1), (1, -1), (1, 1))
+# A cell with no candidate yet, see `voronoi_partition`
+_NO_CANDIDATE = np.iinfo(np.intp).max
 
 
 def get_assign_count(assigned: np.ndarray, size: int) -> np.ndarray:
@@ -31,24 +33,75 @@ def construct_adj_list(
     :param assigned: assignment matrix
     :return: adjacency list of UAVs
     """
-    row, col = assigned.shape
     adj_list: dict[int, set[int]] = defaultdict(set)
-    for r in range(row):
-        for c in range(col):
-            if assigned[r, c] < 0:
-                continue
-            for dr, dc in _4_DIRS[:2]:
-                nr, nc = r + dr, c + dc
-                if (
-                    0 <= nr < row
-                    and 0 <= nc < col
-                    and 0 < assigned[nr, nc] != assigned[r, c]
-                ):
-                    adj_list[assigned[r, c]].add(assigned[nr, nc])  # type: ignore
-                    adj_list[assigned[nr, nc]].add(assigned[r, c])  # type: ignore
+    for label, neighbor in _get_boundary_pairs(assigned)[0].tolist():
+        adj_list[label].add(neighbor)
+        adj_list[neighbor].add(label)
     return adj_list
 
 
+def get_boundary_lengths(assigned: np.ndarray) -> dict[tuple[int, int], int]:
+    """
+    Get the length of the shared boundary of every pair of adjacent labels, to be used as edge weights.
+    :param assigned: assignment matrix
+    :return: Dict of each pair of adjacent labels, in both orders, to the number of 4-adjacent cell pairs
+    """
+    pairs, lengths = _get_boundary_pairs(assigned)
+    boundary_lengths: dict[tuple[int, int], int] = {}
+    for (label, neighbor), length in zip(pairs.tolist(), lengths.tolist()):
+        boundary_lengths[label, neighbor] = boundary_lengths[neighbor, label] = length
+    return boundary_lengths
+
+
+def _get_boundary_pairs(assigned: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find the label pairs that touch by comparing the matrix with its shifted views.
+    :return: (k, 2) array of the pairs (smaller label first), number of touching cell pairs of each pair
+    """
+    size = max(int(assigned.max(initial=-1)) + 1, 1)
+    keys = []
+    for cells, neighbors in (
+        (assigned[1:, :], assigned[:-1, :]),
+        (assigned[:, 1:], assigned[:, :-1]),
+    ):
+        boundary = (cells != neighbors) & (cells >= 0) & (neighbors >= 0)
+        low = np.minimum(cells[boundary], neighbors[boundary]).astype(np.int64)
+        high = np.maximum(cells[boundary], neighbors[boundary])
+        keys.append(low * size + high)
+    counts = np.bincount(np.concatenate(keys), minlength=size * size)
+    pair_keys = np.flatnonzero(counts)
+    return np.stack(np.divmod(pair_keys, size), axis=1), counts[pair_keys]
+
+
+def _build_local_bridge_table() -> list[bool]:
+    """
+    Classify every configuration of the 8-neighborhood of a cell.
+    Bit i of a configuration is set when `_RING[i]` has the cell's label.
+    Consecutive ring cells are 4-adjacent, so the 4-neighbors in one run of set bits stay
+    connected through the ring when the cell is removed. A configuration is conclusive
+    (True) when all 4-neighbors lie in a single run.
+    """
+    table = []
+    for mask in range(256):
+        runs = set()
+        run = 0
+        # Start the scan right after a cleared bit so no run wraps around
+        start = next((i + 1 for i in range(8) if not mask >> i & 1), 0)
+        for k in range(8):
+            i = (start + k) % 8
+            if not mask >> i & 1:
+                run += 1
+            elif i % 2 == 0:  # Even ring positions are 4-neighbors
+                runs.add(run)
+        table.append(len(runs) <= 1)
+    return table
+
+
+# 8-neighborhood in ring order, starting from the top
+_RING = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+_LOCAL_NOT_BRIDGE = _build_local_bridge_table()
+
+
 def _is_not_bridge(assigned: np.ndarray, cell: tuple[int, int]) -> bool:
     """
     Check if removing `cell` from `mat` will result in a connected assignment.
@@ -56,55 +109,178 @@ def _is_not_bridge(assigned: np.ndarray, cell: tuple[int, int]) -> bool:
     :param cell: the cell to remove
     :return: True if connected, False otherwise
     """
-    row, col = assigned.shape
     label = assigned[cell]
     r, c = cell
+    mask = _ring_mask(assigned, cell)
+    # Fast path: the 4-neighbors are connected around the cell
+    if _LOCAL_NOT_BRIDGE[mask]:
+        return True
 
-    neighbors: list[tuple[int, int] | None] = [None] * 4  # top, bottom, left, right
-    if r > 0 and assigned[r - 1, c] == label:
-        neighbors[0] = (r - 1, c)
-    if r < row - 1 and assigned[r + 1, c] == label:
-        neighbors[1] = (r + 1, c)
-    if c > 0 and assigned[r, c - 1] == label:
-        neighbors[2] = (r, c - 1)
-    if c < col - 1 and assigned[r, c + 1] == label:
-        neighbors[3] = (r, c + 1)
-
+    neighbors = [
+        (r + dr, c + dc)
+        for i, (dr, dc) in enumerate(_RING)
+        if i % 2 == 0 and mask >> i & 1
+    ]
     # Remove the label, check for connectivity then restore the label
     assigned[cell] = -1
-    # Check every pair of neighbors to see if they are still connected
-    for i in range(4):
-        for j in range(i):
-            if neighbors[i] and neighbors[j]:
-                connected = _is_connected(assigned, neighbors[i], neighbors[j])  # type: ignore
-                if not connected:
-                    assigned[cell] = label
-                    return False
-
+    connected = _is_connected(assigned, neighbors)
     assigned[cell] = label
+    return connected
+
+
+def _ring_mask(assigned: np.ndarray, cell: tuple[int, int]) -> int:
+    """
+    :return: The 8-neighborhood configuration of `cell`, bit i is set when `_RING[i]` has its label
+    """
+    row, col = assigned.shape
+    label = assigned[cell]
+    r, c = cell
+    mask = 0
+    for i, (dr, dc) in enumerate(_RING):
+        nr, nc = r + dr, c + dc
+        if 0 <= nr < row and 0 <= nc < col and assigned[nr, nc] == label:
+            mask |= 1 << i
+    return mask
+
+
+def _is_connected(mat: np.ndarray, cells: list[tuple[int, int]]) -> bool:
+    """
+    Check if all of `cells` are connected through cells with the same label.
+    One BFS per cell runs in turn and two searches merge when they meet, so the cost is bounded
+    by the smallest separated part when the cells are not connected.
+    """
+    row, col = mat.shape
+    label = mat[cells[0]]
+    owner = {cell: i for i, cell in enumerate(cells)}
+    merged_into = list(range(len(cells)))
+    queues = [deque([cell]) for cell in cells]
+    searches = list(range(len(cells)))
+
+    def find(i: int) -> int:
+        while merged_into[i] != i:
+            merged_into[i] = merged_into[merged_into[i]]
+            i = merged_into[i]
+        return i
+
+    while len(searches) > 1:
+        for i in list(searches):
+            if i not in searches:
+                continue
+            q = queues[i]
+            if not q:
+                # Search i ended without meeting the others
+                return False
+            r, c = q.popleft()
+            for dr, dc in _4_DIRS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < row and 0 <= nc < col and mat[nr, nc] == label:
+                    j = owner.get((nr, nc), None)
+                    if j is None:
+                        owner[nr, nc] = i
+                        q.append((nr, nc))
+                        continue
+                    j = find(j)
+                    if j != i:
+                        merged_into[j] = i
+                        q.extend(queues[j])
+                        queues[j] = deque()
+                        searches.remove(j)
+            if len(searches) == 1:
+                break
     return True
 
 
-def _is_connected(
-    mat: np.ndarray, start: tuple[int, int], end: tuple[int, int]
-) -> bool:
+def _transfer_parts(
+    mat: np.ndarray, cell: tuple[int, int], root: tuple[int, int] | None
+) -> list[tuple[int, int]]:
+    """
+    Find the parts of the region of `cell` that are cut off from `root` without `cell`.
+    One BFS per neighbor of `cell` runs in turn and two searches merge when they meet. Searching
+    stops once only the search that reached `root` is left, so the cost is bounded by the parts
+    that are cut off. The part holding `root` is never returned, even when it is searched first.
+    :return: The index in `_same_label_neighbors` of the last neighbor in each part and its size
+    """
     row, col = mat.shape
-    q = deque([start])
-    visited = set()
-    assert mat[start] == mat[end]
-    label = mat[start]
-    while q:
-        r, c = q.popleft()
-        if (r, c) == end:
-            return True
-        if (r, c) in visited:
-            continue
-        visited.add((r, c))
-        for dr, dc in _4_DIRS:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < row and 0 <= nc < col and mat[nr, nc] == label:
-                q.append((nr, nc))
-    return False
+    label = mat[cell]
+    neighbors = _same_label_neighbors(mat, cell)
+    owner = {neighbor: i for i, neighbor in enumerate(neighbors)}
+    owner[cell] = -1
+    merged_into = list(range(len(neighbors)))
+    queues = [deque([neighbor]) for neighbor in neighbors]
+    sizes = [1] * len(neighbors)
+    running = list(range(len(neighbors)))
+    finished = []
+
+    def find(i: int) -> int:
+        while merged_into[i] != i:
+            merged_into[i] = merged_into[merged_into[i]]
+            i = merged_into[i]
+        return i
+
+    def root_search() -> int:
+        i = owner.get(root, -1) if root is not None else -1  # type: ignore
+        return find(i) if i >= 0 else -1
+
+    while running and running != [root_search()]:
+        for i in list(running):
+            if i not in running:
+                continue
+            q = queues[i]
+            if not q:
+                running.remove(i)
+                finished.append(i)
+                continue
+            r, c = q.popleft()
+            for dr, dc in _4_DIRS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < row and 0 <= nc < col and mat[nr, nc] == label:
+                    j = owner.get((nr, nc), None)
+                    if j is None:
+                        owner[nr, nc] = i
+                        sizes[i] += 1
+                        q.append((nr, nc))
+                        continue
+                    if j < 0:
+                        continue
+                    j = find(j)
+                    if j != i:
+                        merged_into[j] = i
+                        sizes[i] += sizes[j]
+                        q.extend(queues[j])
+                        queues[j] = deque()
+                        running.remove(j)
+
+    # The search holding `root` may also have run out first
+    root_part = root_search()
+    return sorted(
+        (max(k for k in range(len(neighbors)) if find(k) == i), sizes[i])
+        for i in finished
+        if i != root_part
+    )
+
+
+def _transfer_subtrees(
+    mat: np.ndarray, cell: tuple[int, int], parts: list[tuple[int, int]]
+) -> list[set[tuple[int, int]]]:
+    """
+    :param parts: The parts cut off by `cell`, from `_transfer_parts`
+    :return: The cells of each part
+    """
+    neighbors = _same_label_neighbors(mat, cell)
+    return [_dfs_from(mat, cell, neighbors[i]) for i, _ in parts]
+
+
+def _same_label_neighbors(
+    mat: np.ndarray, cell: tuple[int, int]
+) -> list[tuple[int, int]]:
+    row, col = mat.shape
+    label = mat[cell]
+    r, c = cell
+    return [
+        (r + dr, c + dc)
+        for dr, dc in _4_DIRS
+        if 0 <= r + dr < row and 0 <= c + dc < col and mat[r + dr, c + dc] == label
+    ]
 
 
 def transfer_area(
@@ -112,7 +288,7 @@ def transfer_area(
     receiver: int,
     neighbors: set[tuple[int, int]],
     transfer_amount: int,
-    assigned: np.ndarray,
+    assigned: "np.ndarray | PartitionState",
     init_seller_pos: tuple[int, int],
 ) -> int:
     """
@@ -121,10 +297,11 @@ def transfer_area(
     :param receiver: The receiving node (gaining area)
     :param neighbors: The cells belonging to the seller node adjacent to the buyer node
     :param transfer_amount: The ideal amount of cells to transfer
-    :param assigned: The assignment matrix
+    :param assigned: The assignment matrix, or its partition state to keep it up to date
     :param init_seller_pos: The original position for the seller node
     :return: The amount of cells successfully transferred
     """
+    assigned, relabel = _unpack_partition(assigned)
     row, col = assigned.shape
 
     def strongly_connected(cell: tuple[int, int], label: int) -> bool:
@@ -149,7 +326,7 @@ def transfer_area(
         if (r, c) == init_seller_pos:
             continue
         if strongly_connected((r, c), receiver) and _is_not_bridge(assigned, (r, c)):
-            assigned[r, c] = receiver
+            relabel((r, c), receiver)
             transferred += 1
             for dr, dc in _4_DIRS:
                 nr, nc = r + dr, c + dc
@@ -164,7 +341,7 @@ def transfer_area_subtree(
     receiver: int,
     neighbors: set[tuple[int, int]],
     transfer_amount: int,
-    assigned: np.ndarray,
+    assigned: "np.ndarray | PartitionState",
     init_seller_pos: tuple[int, int],
 ) -> int:
     """
@@ -173,10 +350,11 @@ def transfer_area_subtree(
     :param receiver: The receiving node (gaining area)
     :param neighbors: The cells belonging to the seller node adjacent to the buyer node
     :param transfer_amount: The ideal amount of cells to transfer
-    :param assigned: The assignment matrix
+    :param assigned: The assignment matrix, or its partition state to keep it up to date
     :param init_seller_pos: The original position for the seller node
     :return: The amount of cells successfully transferred
     """
+    assigned, relabel = _unpack_partition(assigned)
     row, col = assigned.shape
     transferred = 0
     queue = deque(neighbors)
@@ -185,27 +363,22 @@ def transfer_area_subtree(
         if assigned[r, c] != sender or (r, c) == init_seller_pos:
             continue
         if _is_not_bridge(assigned, (r, c)):
-            assigned[r, c] = receiver
+            relabel((r, c), receiver)
             transferred += 1
             for dr, dc in _4_DIRS:
                 nr, nc = r + dr, c + dc
                 if 0 <= nr < row and 0 <= nc < col and assigned[nr, nc] == sender:
                     queue.append((nr, nc))
         else:
-            subtrees = _dfs_subtree(assigned, (r, c))
-            transfer_subtrees = list(
-                filter(lambda x: init_seller_pos not in x, subtrees)
-            )
-            if (
-                sum(len(subtree) for subtree in transfer_subtrees)
-                >= transfer_amount - transferred
-            ):
+            parts = _transfer_parts(assigned, (r, c), init_seller_pos)
+            if sum(size for _, size in parts) >= transfer_amount - transferred:
                 continue
-            assigned[r, c] = receiver
+            transfer_subtrees = _transfer_subtrees(assigned, (r, c), parts)
+            relabel((r, c), receiver)
             transferred += 1
             for subtree in transfer_subtrees:
                 for cr, cc in subtree:
-                    assigned[cr, cc] = receiver
+                    relabel((cr, cc), receiver)
                     transferred += 1
                     for cdr, cdc in _4_DIRS:
                         cnr, cnc = cr + cdr, cc + cdc
@@ -219,28 +392,56 @@ def transfer_area_subtree(
     return transferred
 
 
-def _dfs_subtree(mat: np.ndarray, root: tuple[int, int]) -> list[set[tuple[int, int]]]:
+def transfer_area_between(
+    sender: int,
+    receiver: int,
+    transfer_amount: int,
+    assigned: np.ndarray,
+    init_seller_pos: tuple[int, int],
+) -> int:
+    """
+    Same as `transfer_area_subtree` from all the cells of the seller adjacent to the buyer.
+    Only reads and writes the cells of the two nodes, see `TransferScheduler`.
+    """
+    return transfer_area_subtree(
+        sender,
+        receiver,
+        get_adjacent_cells(assigned, sender, receiver),
+        transfer_amount,
+        assigned,
+        init_seller_pos,
+    )
+
+
+def _unpack_partition(
+    assigned: "np.ndarray | PartitionState",
+) -> tuple[np.ndarray, Callable[[tuple[int, int], int], None]]:
     """
-    Run Depth First Search on mat starting from root.
-    :param mat: matrix to run DFS on
-    :param root: the coordinate of root _node
-    :return: list of subtrees of `root` on the resulting DFS tree
+    :return: The assignment matrix, function relabeling one of its cells
+    """
+    if isinstance(assigned, PartitionState):
+        return assigned.assigned, assigned.relabel
+
+    def relabel(cell: tuple[int, int], label: int) -> None:
+        assigned[cell] = label
+
+    return assigned, relabel
+
+
+def _dfs_from(
+    mat: np.ndarray, root: tuple[int, int], start: tuple[int, int]
+) -> set[tuple[int, int]]:
+    """
+    Run Depth First Search on mat from `start`, a neighbor of `root`, without passing through `root`.
+    :return: The visited cells
     """
     _row, _col = mat.shape
     _label = mat[root]
-    stack: list[tuple[tuple[int, int], set[tuple[int, int]]]] = []
-    subtrees: list[set[tuple[int, int]]] = []
+    stack = [start]
     visited = {root}
-    _r, _c = root
-    for _dr, _dc in _4_DIRS:
-        _nr, _nc = _r + _dr, _c + _dc
-        if 0 <= _nr < _row and 0 <= _nc < _col and mat[_nr, _nc] == _label:
-            subtree: set[tuple[int, int]] = set()
-            subtrees.append(subtree)
-            stack.append(((_nr, _nc), subtree))
-
+    subtree: set[tuple[int, int]] = set()
     while stack:
-        _node, subtree = stack.pop()
+        _node = stack.pop()
         if _node in visited:
             continue
         visited.add(_node)
@@ -249,24 +450,25 @@ def _dfs_subtree(mat: np.ndarray, root: tuple[int, int]) -> list[set[tuple[int,
         for _dr, _dc in _4_DIRS:
             _nr, _nc = _r + _dr, _c + _dc
             if 0 <= _nr < _row and 0 <= _nc < _col and mat[_nr, _nc] == _label:
-                stack.append(((_nr, _nc), subtree))
-
-    return [subtree for subtree in subtrees if subtree]
+                stack.append((_nr, _nc))
+    return subtree
 
 
 def transfer_concurrently(
     from_node: int,
     to_nodes: dict[int, int],
-    assigned: np.ndarray,
+    assigned: "np.ndarray | PartitionState",
     from_node_init_pos: tuple[int, int] | None,
 ) -> None:
     """
     Concurrently transfer from node to all of `to_nodes`.
     :param from_node: Node to tranfer area from
     :param to_nodes: Dict of nodes to transfer area to. Value is their desired transfer amount
-    :param assigned: Assignment matrix
+    :param assigned: Assignment matrix, or its partition state to keep it up to date
     :param from_node_init_pos: The initial position of `from_node` to avoid. If None then take all of its area.
     """
+    partition = assigned
+    assigned, relabel = _unpack_partition(partition)
     row, col = assigned.shape
     transferred = {node: 0 for node in to_nodes}
     queues = {
@@ -277,7 +479,10 @@ def transfer_concurrently(
             if node not in queues:
                 continue
             if from_node_init_pos is None and len(queues) == 1:
-                assigned[assigned == from_node] = node
+                if isinstance(partition, PartitionState):
+                    partition.relabel_all(from_node, node)
+                else:
+                    assigned[assigned == from_node] = node
                 del queues[node]
                 break
             q = queues[node]
@@ -286,7 +491,7 @@ def transfer_concurrently(
                 if (r, c) == from_node_init_pos or assigned[r, c] != from_node:
                     continue
                 if _is_not_bridge(assigned, (r, c)):
-                    assigned[r, c] = node
+                    relabel((r, c), node)
                     transferred[node] += 1
                     for dr, dc in _4_DIRS:
                         nr, nc = r + dr, c + dc
@@ -298,20 +503,18 @@ def transfer_concurrently(
                             q.append((nr, nc))
                     break
                 else:
-                    subtrees = _dfs_subtree(assigned, (r, c))
-                    transfer_subtrees = list(
-                        filter(lambda x: from_node_init_pos not in x, subtrees)
-                    )
+                    parts = _transfer_parts(assigned, (r, c), from_node_init_pos)
                     if (
-                        sum(len(subtree) for subtree in transfer_subtrees)
+                        sum(size for _, size in parts)
                         >= to_nodes[node] - transferred[node]
                     ):
                         continue
-                    assigned[r, c] = node
+                    transfer_subtrees = _transfer_subtrees(assigned, (r, c), parts)
+                    relabel((r, c), node)
                     transferred[node] += 1
                     for subtree in transfer_subtrees:
                         for cr, cc in subtree:
-                            assigned[cr, cc] = node
+                            relabel((cr, cc), node)
                             transferred[node] += 1
                             for cdr, cdc in _4_DIRS:
                                 cnr, cnc = cr + cdr, cc + cdc
@@ -331,92 +534,514 @@ def dfs_weighted_tree(
     adj_list: dict[int, Iterable[int]],
     node_weights: np.ndarray[int],
     root: int,
-) -> tuple[dict[int, list[int]], dict[int, tuple[int, int]]]:
+) -> tuple[list[np.ndarray], np.ndarray]:
     """
     Run Depth First Search on the adjacency list to get the weighted tree
     :param adj_list: adjacency list of nodes
     :param node_weights: the weight of each node
     :param root: root node
-    :return: Adjacency list of DFS tree, Dict of each node to the number of children and theirs weights
+    :return: Children of each node in the tree, (n, 2) array of each node's subtree size and weight.
+             Nodes unreachable from `root` have no children and a zero subtree.
     """
-    adj_list_weighted: dict[int, list[int]] = defaultdict(list)
-    visited: set[int] = set()
+    num_nodes = len(node_weights)
+    parents = np.full(num_nodes, -1, dtype=np.intp)
+    visited = np.zeros(num_nodes, dtype=bool)
+    order: list[int] = []  # Nodes in visiting order
 
-    q = deque([(root, None)])
+    q = deque([(root, -1)])
     while q:
         node, parent = q.popleft()
-        if node in visited:
+        if visited[node]:
             continue
 
-        visited.add(node)
-        if parent is not None:
-            adj_list_weighted[parent].append(node)  # type: ignore
+        visited[node] = True
+        parents[node] = parent
+        order.append(node)
 
         for neighbor in adj_list[node]:
             if neighbor != parent:
-                q.append((neighbor, node))  # type: ignore
+                q.append((neighbor, node))
+
+    # Children grouped by parent, each group in visiting order
+    visit_order = np.array(order[1:], dtype=np.intp)
+    visit_order = visit_order[np.argsort(parents[visit_order], kind="stable")]
+    child_counts = np.bincount(parents[visit_order], minlength=num_nodes)
+    children = np.split(visit_order, np.cumsum(child_counts)[:-1])
 
-    node_weight: dict[int, tuple[int, int]] = {}
+    # Accumulate subtrees from the last visited node, children are visited after their parent
+    node_weight = np.zeros((num_nodes, 2), dtype=np.int64)
+    node_weight[visited, 0] = 1
+    node_weight[visited, 1] = np.asarray(node_weights)[visited]
+    for node in reversed(order[1:]):
+        node_weight[parents[node]] += node_weight[node]
+    return children, node_weight
 
-    def transverse(_node: int) -> tuple[int, int]:
-        count = 1
-        weight = node_weights[_node]
-        for child in adj_list_weighted[_node]:
-            child_count, child_weight = transverse(child)
-            count += child_count
-            weight += child_weight
-        node_weight[_node] = (count, weight)
-        return count, weight
 
-    transverse(root)
-    return adj_list_weighted, node_weight
+def iter_post_order(
+    children: list[np.ndarray], root: int, key: Callable[[int], int]
+) -> Iterator[tuple[int, int]]:
+    """
+    Walk the tree in post-order, visiting the children of each node sorted by `key`.
+    :param children: Children of each node, as returned by `dfs_weighted_tree`
+    :param root: The root node
+    :param key: Sort key of the children
+    :return: Iterator of (node, parent) for every node other than the root, each after its subtree
+    """
+    stack = [(root, iter(sorted(children[root].tolist(), key=key)))]
+    while stack:
+        node, remaining = stack[-1]
+        child = next(remaining, None)
+        if child is not None:
+            stack.append((child, iter(sorted(children[child].tolist(), key=key))))
+            continue
+        stack.pop()
+        if stack:
+            yield node, stack[-1][0]
 
 
-def map_to_assignment_matrix(_map: Map, uavs: list[UAV]) -> np.ndarray:
-    assigned = -1 * _map.to_numpy()
-    uav_names = {uav.name: i for i, uav in enumerate(uavs)}
-    for r in range(_map.height):
-        for c in range(_map.width):
-            if assigned[r, c] < 0:
+class DisjointSet:
+    """
+    Disjoint sets of the elements 0..size-1, kept in flat arrays.
+    `find` halves the paths it walks, `union` attaches the root of lower rank.
+    """
+
+    def __init__(self, size: int):
+        self.parents = list(range(size))
+        self.ranks = [0] * size
+        self.n_components = size
+
+    def find(self, element: int) -> int:
+        parents = self.parents
+        while parents[element] != element:
+            parents[element] = parents[parents[element]]
+            element = parents[element]
+        return element
+
+    def union(self, element1: int, element2: int) -> bool:
+        """
+        :return: Whether the two elements were in different sets
+        """
+        root1, root2 = self.find(element1), self.find(element2)
+        if root1 == root2:
+            return False
+        ranks = self.ranks
+        if ranks[root1] < ranks[root2]:
+            root1, root2 = root2, root1
+        self.parents[root2] = root1
+        ranks[root1] += ranks[root1] == ranks[root2]
+        self.n_components -= 1
+        return True
+
+    def union_all(self, elements1: list[int], elements2: list[int]) -> list[int]:
+        """
+        Same as calling `union` on each pair in order.
+        :return: The indices of the pairs that were in different sets
+        """
+        parents, ranks = self.parents, self.ranks
+        merged = []
+        for i, (root1, root2) in enumerate(zip(elements1, elements2)):
+            while parents[root1] != root1:
+                parents[root1] = root1 = parents[parents[root1]]
+            while parents[root2] != root2:
+                parents[root2] = root2 = parents[parents[root2]]
+            if root1 == root2:
                 continue
-            label = _map.get_cell(r, c).assign
-            assigned[r, c] = uav_names[label]
-    return assigned
+            if ranks[root1] < ranks[root2]:
+                root1, root2 = root2, root1
+            parents[root2] = root1
+            ranks[root1] += ranks[root1] == ranks[root2]
+            merged.append(i)
+        self.n_components -= len(merged)
+        return merged
+
+
+def map_to_assignment_matrix(_map: Map, uavs: list[UAV]) -> np.ndarray:
+    """
+    Get the assignment matrix of the map, labeled by the index of each uav in `uavs`.
+    The matrix is a view of the map's labels, writing to it changes the map's assignment.
+    :param _map: The map
+    :param uavs: The uavs
+    :return: The assignment matrix, occupied cells are labeled -1
+    """
+    return _map.get_assignment_matrix(uavs)
+
+
+class LabelIndex:
+    """
+    Cells of every label of an assignment matrix, built in one pass.
+    The flat indices of all assigned cells are sorted by label (row-major within a label),
+    so the cells of `label` are the slice `indices[offsets[label]:offsets[label + 1]]`.
+    """
+
+    def __init__(self, assigned: np.ndarray, size: int):
+        """
+        :param assigned: The assignment matrix, cells labeled < 0 are ignored
+        :param size: The number of labels
+        """
+        self.width = assigned.shape[1]
+        labels = assigned.ravel()
+        assigned_indices = np.flatnonzero(labels >= 0)
+        self.indices = assigned_indices[
+            np.argsort(labels[assigned_indices], kind="stable")
+        ]
+        self.counts = np.bincount(labels[assigned_indices], minlength=size)
+        self.offsets = np.zeros(len(self.counts) + 1, dtype=np.intp)
+        np.cumsum(self.counts, out=self.offsets[1:])
+
+    def flat_cells(self, label: int) -> np.ndarray:
+        return self.indices[self.offsets[label] : self.offsets[label + 1]]
+
+    def cells(self, label: int) -> np.ndarray:
+        """
+        :return: An (N, 2) array of the (r, c) of the cells labeled `label`
+        """
+        return np.stack(np.divmod(self.flat_cells(label), self.width), axis=1)
 
 
 def get_partition(assigned: np.ndarray, size: int) -> list[list[tuple[int, int]]]:
-    partition: list[list[tuple[int, int]]] = [[] for _ in range(size)]
-    for index, val in np.ndenumerate(assigned):
-        if val >= 0:
-            partition[val].append(index)
-    return partition
+    label_index = LabelIndex(assigned, size)
+    rows, cols = np.divmod(label_index.indices, label_index.width)
+    cells = list(zip(rows.tolist(), cols.tolist()))
+    offsets = label_index.offsets.tolist()
+    return [cells[offsets[label] : offsets[label + 1]] for label in range(size)]
 
 
 def get_neighbors(
-    assigned: np.ndarray, cells: list[tuple[int, int]]
+    assigned: np.ndarray, cells: list[tuple[int, int]] | np.ndarray
 ) -> dict[int, set[tuple[int, int]]]:
+    """
+    Get the cells of other labels adjacent to `cells`.
+    :param assigned: The assignment matrix
+    :param cells: The cells of one label
+    :return: Dict of each adjacent label to its cells adjacent to `cells`
+    """
     row, col = assigned.shape
-    neighbors = defaultdict(set)
-    label = assigned[cells[0]]
-    for r, c in cells:
-        for dr, dc in _4_DIRS:
-            nr, nc = r + dr, c + dc
-            if 0 <= nr < row and 0 <= nc < col and 0 <= assigned[nr, nc] != label:
-                neighbors[assigned[nr, nc]].add((nr, nc))
+    cells = np.asarray(cells, dtype=np.intp).reshape(-1, 2)
+    neighbors: dict[int, set[tuple[int, int]]] = defaultdict(set)
+    if len(cells) == 0:
+        return neighbors
+    label = assigned[cells[0, 0], cells[0, 1]]
+    # Every (cell, direction) candidate, in the order of `cells` then `_4_DIRS`
+    candidates = (cells[:, None, :] + np.array(_4_DIRS)).reshape(-1, 2)
+    inside = (
+        (candidates[:, 0] >= 0)
+        & (candidates[:, 0] < row)
+        & (candidates[:, 1] >= 0)
+        & (candidates[:, 1] < col)
+    )
+    candidates = candidates[inside]
+    candidate_labels = assigned[candidates[:, 0], candidates[:, 1]]
+    adjacent = (candidate_labels >= 0) & (candidate_labels != label)
+    for neighbor_label, r, c in zip(
+        candidate_labels[adjacent].tolist(),
+        candidates[adjacent, 0].tolist(),
+        candidates[adjacent, 1].tolist(),
+    ):
+        neighbors[neighbor_label].add((r, c))
     return neighbors
 
 
 def get_adjacent_cells(
     assigned: np.ndarray, from_label: int, to_label: int
 ) -> set[tuple[int, int]]:
-    row, col = assigned.shape
-    adjacent_cells = set()
-    for r in range(row):
-        for c in range(col):
-            if assigned[r, c] == from_label:
-                for dr, dc in _4_DIRS:
-                    nr, nc = r + dr, c + dc
-                    if 0 <= nr < row and 0 <= nc < col and assigned[nr, nc] == to_label:
-                        adjacent_cells.add((r, c))
-                        break
-    return adjacent_cells
+    """
+    Get the cells labeled `from_label` that are 4-adjacent to a cell labeled `to_label`
+    """
+    is_to = assigned == to_label
+    near_to = np.zeros_like(is_to)
+    near_to[1:, :] |= is_to[:-1, :]
+    near_to[:-1, :] |= is_to[1:, :]
+    near_to[:, 1:] |= is_to[:, :-1]
+    near_to[:, :-1] |= is_to[:, 1:]
+    rows, cols = np.nonzero((assigned == from_label) & near_to)
+    return set(zip(rows.tolist(), cols.tolist()))
+
+
+def even_bounding_box(
+    mask: np.ndarray,
+    cell: tuple[int | None, int | None],
+    shape: tuple[int, int],
+) -> tuple[tuple[int, int], tuple[int, int]]:
+    """
+    Bounding box of the mask and the cell with even corners, so that it holds whole 2x2 blocks
+    :param cell: A cell to keep inside the box, ignored if its coordinates are not set
+    :param shape: The bottom right corner is clipped to it
+    :return: The (r, c) of the top left corner and of the bottom right corner (exclusive)
+    """
+    rows = np.flatnonzero(mask.any(axis=1)).tolist()
+    cols = np.flatnonzero(mask.any(axis=0)).tolist()
+    if cell[0] is not None and cell[1] is not None:
+        rows.append(cell[0])
+        cols.append(cell[1])
+    if not rows:
+        return (0, 0), (0, 0)
+    top, left = min(rows) & ~1, min(cols) & ~1
+    bottom = min((max(rows) + 2) & ~1, shape[0])
+    right = min((max(cols) + 2) & ~1, shape[1])
+    return (top, left), (max(bottom, top), max(right, left))
+
+
+def voronoi_partition(
+    free: np.ndarray,
+    sources: list[tuple[int, int]],
+    dirs: tuple[tuple[int, int], ...] = _4_DIRS,
+    capacity: int | None = None,
+) -> np.ndarray:
+    """
+    Label the cells reachable from the sources with their nearest source, the same as a breadth
+    first search from all sources with one queue. The search is run one whole frontier at a time:
+    a cell of the next frontier goes to the first cell of the frontier, then the first direction
+    in `dirs`, that reaches it, and the next frontier is kept in that order.
+    With a capacity, the smallest regions grow first and a region stops growing once it has
+    `capacity` cells, leaving the cells it cannot take to the other regions reaching them.
+    The cells left once every region stopped go to the nearest region, so regions stay connected.
+    :param free: The cells the search can go through
+    :param sources: The position of each source, a source is labeled even on a cell that is not free
+    and skipped if an earlier source has the same position
+    :param dirs: The directions, in the order the search pushes neighbors
+    :param capacity: The number of cells a region grows to, None for no limit
+    :return: The index of the source of each cell, -1 for cells not reached
+    """
+    height, width = free.shape
+    stride = width + 2
+    # Pad with cells that are not free so that every neighbor is in the grid
+    padded = np.zeros((height + 2, stride), dtype=bool)
+    padded[1:-1, 1:-1] = free
+    expandable = padded.ravel()
+    labels = np.full(expandable.shape, -1, dtype=np.intp)
+    # Position of the first candidate reaching each cell, a cell is a candidate of one frontier only
+    first_candidate = np.full(expandable.shape, _NO_CANDIDATE, dtype=np.intp)
+    offsets = np.array([dr * stride + dc for dr, dc in dirs], dtype=np.intp)
+
+    frontier_list, frontier_labels_list = [], []
+    for label, (r, c) in enumerate(sources):
+        cell = (r + 1) * stride + c + 1
+        if labels[cell] < 0:
+            labels[cell] = label
+            frontier_list.append(cell)
+            frontier_labels_list.append(label)
+    frontier = np.array(frontier_list, dtype=np.intp)
+    frontier_labels = np.array(frontier_labels_list, dtype=np.intp)
+    expandable[frontier] = False
+    counts = np.bincount(frontier_labels, minlength=len(sources))
+    while len(frontier) or capacity is not None:
+        if not len(frontier):
+            # Every region is full or blocked, the cells left go to the nearest region
+            capacity = None
+            frontier = np.flatnonzero(labels >= 0)
+            frontier_labels = labels[frontier]
+            continue
+        if capacity is not None:
+            growing = counts[frontier_labels] < capacity
+            frontier, frontier_labels = frontier[growing], frontier_labels[growing]
+            if not len(frontier):
+                continue
+            # The smallest regions grow first, the others keep their frontier for later
+            active = counts[frontier_labels] == counts[frontier_labels].min()
+            waiting = frontier[~active], frontier_labels[~active]
+            frontier, frontier_labels = frontier[active], frontier_labels[active]
+        candidates = (frontier[:, None] + offsets).ravel()
+        reached = expandable[candidates]
+        candidates = candidates[reached]
+        candidate_labels = np.repeat(frontier_labels, len(offsets))[reached]
+        first = _first_candidates(first_candidate, candidates)
+        while capacity is not None:
+            new_labels = candidate_labels[first]
+            over = _rank_by_label(new_labels) >= capacity - counts[new_labels]
+            if not over.any():
+                break
+            # The regions over capacity are full, the cells they cannot take go to
+            # the next candidates reaching them
+            full = np.zeros(len(counts), dtype=bool)
+            full[new_labels[over]] = True
+            dropped = candidates[first][over]
+            kept = ~(full[candidate_labels] & np.isin(candidates, dropped))
+            first_candidate[dropped] = _NO_CANDIDATE
+            candidates, candidate_labels = candidates[kept], candidate_labels[kept]
+            first_candidate[candidates] = _NO_CANDIDATE
+            first = _first_candidates(first_candidate, candidates)
+        frontier, frontier_labels = candidates[first], candidate_labels[first]
+        labels[frontier] = frontier_labels
+        expandable[frontier] = False
+        counts += np.bincount(frontier_labels, minlength=len(counts))
+        if capacity is not None:
+            frontier = np.concatenate((waiting[0], frontier))
+            frontier_labels = np.concatenate((waiting[1], frontier_labels))
+    return labels.reshape(padded.shape)[1:-1, 1:-1]
+
+
+def _first_candidates(
+    first_candidate: np.ndarray, candidates: np.ndarray
+) -> np.ndarray:
+    """
+    :return: Mask of the first occurrence of each cell in `candidates`
+    """
+    order = np.arange(len(candidates))
+    np.minimum.at(first_candidate, candidates, order)
+    return first_candidate[candidates] == order
+
+
+def _rank_by_label(labels: np.ndarray) -> np.ndarray:
+    """
+    :return: The number of earlier elements with the same label, for each element
+    """
+    order = np.argsort(labels, kind="stable")
+    sorted_labels = labels[order]
+    ranks = np.empty(len(labels), dtype=np.intp)
+    ranks[order] = np.arange(len(labels)) - np.searchsorted(
+        sorted_labels, sorted_labels
+    )
+    return ranks
+
+
+class PartitionState:
+    """
+    Partition of an assignment matrix kept up to date as cells are relabeled.
+    Holds the number of cells of every label and, for every pair of adjacent labels (a, b),
+    the cells of a that touch b, and the cells of every label as a sparse set: an unordered list
+    per label and the position of each cell in its list. Relabeling a cell through `relabel`
+    costs O(1), so transfer loops never rescan the matrix.
+    """
+
+    def __init__(self, assigned: np.ndarray, size: int):
+        """
+        :param assigned: The assignment matrix, relabeled in place
+        :param size: The number of labels
+        """
+        self.assigned = assigned
+        self.size = size
+        self.width = assigned.shape[1]
+        label_index = LabelIndex(assigned, size)
+        self.counts = label_index.counts
+        self._members = [
+            label_index.flat_cells(label).tolist() for label in range(size)
+        ]
+        self._position = np.zeros(assigned.size, dtype=np.intp)
+        self._position[label_index.indices] = np.arange(
+            len(label_index.indices)
+        ) - np.repeat(label_index.offsets[:-1], label_index.counts)
+        # Boundary cell (flat index) -> its label when registered, labels of its neighbors
+        self._adjacent: dict[int, tuple[int, set[int]]] = {}
+        self._boundary: dict[tuple[int, int], set[int]] = defaultdict(set)
+        self._border: dict[int, set[int]] = defaultdict(set)
+
+        labels = assigned.ravel()
+        row, col = assigned.shape
+        flat_cells = np.arange(labels.size).reshape(row, col)
+        for cells, neighbors in (
+            (flat_cells[1:, :], flat_cells[:-1, :]),
+            (flat_cells[:-1, :], flat_cells[1:, :]),
+            (flat_cells[:, 1:], flat_cells[:, :-1]),
+            (flat_cells[:, :-1], flat_cells[:, 1:]),
+        ):
+            cell_labels, neighbor_labels = labels[cells], labels[neighbors]
+            touching = (
+                (cell_labels != neighbor_labels)
+                & (cell_labels >= 0)
+                & (neighbor_labels >= 0)
+            )
+            for cell, label, neighbor_label in zip(
+                cells[touching].tolist(),
+                cell_labels[touching].tolist(),
+                neighbor_labels[touching].tolist(),
+            ):
+                if cell not in self._adjacent:
+                    self._adjacent[cell] = label, set()
+                    self._border[label].add(cell)
+                self._adjacent[cell][1].add(neighbor_label)
+                self._boundary[label, neighbor_label].add(cell)
+
+    def count(self, label: int) -> int:
+        return int(self.counts[label])
+
+    def cells(self, label: int) -> np.ndarray:
+        """
+        :return: An (N, 2) array of the (r, c) of the cells labeled `label`, in no particular order
+        """
+        flat_cells = np.array(self._members[label], dtype=np.intp)
+        return np.stack(np.divmod(flat_cells, self.width), axis=1)
+
+    def boundary(self, label: int, other: int) -> set[tuple[int, int]]:
+        """
+        :return: The cells labeled `label` that are 4-adjacent to a cell labeled `other`
+        """
+        return {divmod(cell, self.width) for cell in self._boundary.get((label, other), ())}  # type: ignore
+
+    def neighbors(self, label: int) -> dict[int, set[tuple[int, int]]]:
+        """
+        Same as `get_neighbors` on the cells of `label`, built from its boundary cells only.
+        """
+        row, col = self.assigned.shape
+        neighbors: dict[int, set[tuple[int, int]]] = defaultdict(set)
+        # Insert in the order of `get_neighbors` so the sets iterate the same way
+        for cell in sorted(self._border.get(label, ())):
+            r, c = divmod(cell, self.width)
+            for dr, dc in _4_DIRS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < row and 0 <= nc < col:
+                    neighbor_label = int(self.assigned[nr, nc])
+                    if neighbor_label >= 0 and neighbor_label != label:
+                        neighbors[neighbor_label].add((nr, nc))
+        return neighbors
+
+    def relabel(self, cell: tuple[int, int], label: int) -> None:
+        r, c = cell
+        old_label = self.assigned[r, c]
+        if old_label == label:
+            return
+        self.assigned[r, c] = label
+        cell = r * self.width + c
+        if old_label >= 0:
+            self.counts[old_label] -= 1
+            # Move the last member of the old label into the place of the cell
+            members = self._members[old_label]
+            last = members.pop()
+            if last != cell:
+                position = self._position[cell]
+                members[position] = last
+                self._position[last] = position
+        if label >= 0:
+            self.counts[label] += 1
+            self._position[cell] = len(self._members[label])
+            self._members[label].append(cell)
+
+        row, col = self.assigned.shape
+        self._update(r, c)
+        for dr, dc in _4_DIRS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < row and 0 <= nc < col:
+                self._update(nr, nc)
+
+    def relabel_all(self, from_label: int, to_label: int) -> None:
+        """
+        Relabel every cell of `from_label`
+        """
+        for r, c in self.cells(from_label).tolist():
+            self.relabel((r, c), to_label)
+
+    def _update(self, r: int, c: int) -> None:
+        cell = r * self.width + c
+        registered = self._adjacent.pop(cell, None)
+        if registered is not None:
+            old_label, old_neighbor_labels = registered
+            self._border[old_label].discard(cell)
+            for neighbor_label in old_neighbor_labels:
+                self._boundary[old_label, neighbor_label].discard(cell)
+
+        label = int(self.assigned[r, c])
+        if label < 0:
+            return
+        row, col = self.assigned.shape
+        neighbor_labels = set()
+        for dr, dc in _4_DIRS:
+            nr, nc = r + dr, c + dc
+            if 0 <= nr < row and 0 <= nc < col:
+                neighbor_label = int(self.assigned[nr, nc])
+                if neighbor_label >= 0 and neighbor_label != label:
+                    neighbor_labels.add(neighbor_label)
+        if not neighbor_labels:
+            return
+        self._adjacent[cell] = label, neighbor_labels
+        self._border[label].add(cell)
+        for neighbor_label in neighbor_labels:
+            self._boundary[label, neighbor_label].add(cell)
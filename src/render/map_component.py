@@ -130,11 +130,11 @@ class MapComponent(Component):
             #         self.surface,
             #         uav.color,
             #         (
-            #             (trajectory[i].c + 0.5) * self.cell_width,
-            #             (trajectory[i].r + 0.5) * self.cell_height,
+            #             (trajectory[i][1] + 0.5) * self.cell_width,
+            #             (trajectory[i][0] + 0.5) * self.cell_height,
             #         ),
             #         (
-            #             (trajectory[(i + 1) % n].c + 0.5) * self.cell_width,
-            #             (trajectory[(i + 1) % n].r + 0.5) * self.cell_height,
+            #             (trajectory[(i + 1) % n][1] + 0.5) * self.cell_width,
+            #             (trajectory[(i + 1) % n][0] + 0.5) * self.cell_height,
             #         ),
             #     )
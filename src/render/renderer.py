@@ -2,6 +2,7 @@ from tkinter.filedialog import askopenfilename, asksaveasfilename
 
 import pygame
 
+from src.core.fleet import Fleet
 from src.core.map import Map
 from src.core.uav import UAV
 from src.core.utils import load_map_from_file, save_map_to_file
@@ -92,6 +93,7 @@ class Renderer(ComposableComponent):
         )
 
         self.planner: ContinuousCoveragePathPlanner | None = None
+        self.fleet: Fleet | None = None
 
         # self.new_uav_slider = Slider(
         #     pygame.Surface((200, 42)),
@@ -131,6 +133,7 @@ class Renderer(ComposableComponent):
                 self.map_component.set_map(Map.create_empty_map(512, 512))
                 self.map_component.set_uavs([])
                 self.planner = None
+                self.fleet = None
                 for uav in self.uavs:
                     uav.reset()
                 self._create_uav_panel()
@@ -164,6 +167,7 @@ class Renderer(ComposableComponent):
             filetypes=[
                 ("Image files", "*.png *.jpg *.jpeg *.gif *.bmp *.tiff *.ico"),
                 ("Text files", "*.txt"),
+                ("Map files", "*.map"),
             ],
         )
         if not filename:
@@ -179,6 +183,7 @@ class Renderer(ComposableComponent):
             filetypes=[
                 ("Image files", "*.png *.jpg *.jpeg *.gif *.bmp *.tiff *.ico"),
                 ("Text files", "*.txt"),
+                ("Map files", "*.map"),
             ],
         )
         if not filename:
@@ -231,10 +236,10 @@ class Renderer(ComposableComponent):
                 handler=self.handler_dropdown.get_selected(),
             )
             self.planner.plan()
+            self.fleet = Fleet(self.uavs)
 
         if not self.map_component.uavs:
             self.map_component.set_uavs(self.uavs)
             self._create_uav_panel()
 
-        for uav in self.uavs:
-            uav.move()
+        self.fleet.step()  # type: ignore
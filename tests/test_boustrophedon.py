@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.core.cell import CellType
+from src.core.map import Map
+from src.core.uav import UAV
+from src.planner.cpp.single.planner import SingleCoveragePathPlannerFactory
+
+
+def plan(cell_types: np.ndarray, r: int, c: int) -> np.ndarray:
+    area = Map(cell_types)
+    uav = UAV(r=r, c=c, has_color=False)
+    area.set_assignment_matrix(
+        np.where(cell_types == CellType.FREE.value, 0, -1), [uav]
+    )
+    SingleCoveragePathPlannerFactory.get_planner("Boustrophedon", area, uav).plan()
+    return uav.trajectory  # type: ignore
+
+
+def assert_coverage(trajectory: np.ndarray, cell_types: np.ndarray) -> None:
+    free = cell_types == CellType.FREE.value
+    assert free[trajectory[:, 0], trajectory[:, 1]].all()
+    assert len(set(map(tuple, trajectory.tolist()))) == np.count_nonzero(free)
+    # Every step of the cycle, back to the start, moves to a next cell
+    steps = np.diff(trajectory, axis=0, append=trajectory[:1])
+    assert (np.abs(steps).sum(axis=1) == 1).all()
+
+
+# An open area is swept along its longest side, going back to the start at the end
+open_area = np.zeros((4, 6), dtype=np.uint8)
+trajectory = plan(open_area, 0, 0)
+assert_coverage(trajectory, open_area)
+assert trajectory[:8].tolist() == [
+    [0, 0], [0, 1], [0, 2], [0, 3], [0, 4], [0, 5], [1, 5], [1, 4]
+]  # fmt: skip
+assert trajectory[-3:].tolist() == [[3, 0], [2, 0], [1, 0]]
+print("OK")
+
+# Cells split and merged by obstacles are all covered, from any start
+cell_types = np.array(
+    [
+        [0, 0, 0, 0, 0, 0, 1],
+        [0, 1, 1, 0, 1, 0, 0],
+        [0, 1, 0, 0, 1, 1, 0],
+        [0, 0, 0, 1, 0, 0, 0],
+        [1, 0, 1, 1, 0, 1, 0],
+        [0, 0, 0, 0, 0, 1, 0],
+    ],
+    dtype=np.uint8,
+)
+for r, c in zip(*np.nonzero(cell_types == CellType.FREE.value)):
+    trajectory = plan(cell_types, int(r), int(c))
+    assert trajectory[0].tolist() == [r, c]
+    assert_coverage(trajectory, cell_types)
+print("OK")
@@ -0,0 +1,37 @@
+from src.core.fleet import Fleet
+from src.core.uav import UAV
+
+square = [(0, 0), (0, 1), (1, 1), (1, 0)]
+line = [(2, 0), (2, 1), (2, 2)]
+
+
+def make_uavs(**kwargs) -> list[UAV]:
+    return [
+        UAV(name="UAV-1", r=0, c=1, trajectory=square, has_color=False, **kwargs),
+        UAV(name="UAV-2", r=2, c=2, trajectory=line, has_color=False, **kwargs),
+    ]
+
+
+# Stepping the fleet is the same as moving each UAV
+for kwargs in [{}, {"history_capacity": 4}, {"history_stride": 3}]:
+    expected, uavs = make_uavs(**kwargs), make_uavs(**kwargs)
+    fleet = Fleet(uavs)
+    for k in [1, 5, 0, 11]:
+        for uav in expected:
+            for _ in range(k):
+                uav.move()
+        fleet.step(k)
+        for uav, other in zip(uavs, expected):
+            assert (uav.r, uav.c, uav.pos_idx) == (other.r, other.c, other.pos_idx)
+            assert uav.movement == other.movement
+    assert fleet.positions.tolist() == [[uav.r, uav.c] for uav in uavs]
+
+# The packed state follows new trajectories and UAVs
+uavs = make_uavs()
+fleet = Fleet(uavs)
+uavs[0].update_trajectory([(0, 1), (0, 2), (1, 2)])
+uavs.append(UAV(name="UAV-3", r=1, c=0, trajectory=square, has_color=False))
+fleet.step(2)
+assert [(uav.r, uav.c) for uav in uavs] == [(1, 2), (2, 1), (0, 1)]
+assert fleet.offsets.tolist() == [0, 3, 6]
+print("OK")
@@ -0,0 +1,76 @@
+import numpy as np
+
+from src.core.cell import CellType
+from src.core.map import Map
+from src.core.uav import UAV
+
+grid = np.array(
+    [
+        [0, 0, 1],
+        [1, 0, 0],
+    ],
+    dtype=np.uint8,
+)
+test_map = Map.from_numpy(grid)
+assert (test_map.height, test_map.width) == (2, 3)
+assert np.array_equal(test_map.to_numpy(), grid)
+assert [cell.coordinate for cell in test_map.free_cells] == [
+    (0, 0),
+    (0, 1),
+    (1, 1),
+    (1, 2),
+]
+assert [cell.coordinate for cell in test_map.occupied_cells] == [(0, 2), (1, 0)]
+
+# Cell views read from and write through to the map
+uav = UAV(name="UAV-1", has_color=False)
+test_map.assign(0, 1, uav)
+assert test_map.get_cell(0, 1).assign == uav.name
+assert test_map.cells[0][1].assign == uav.name
+assert test_map.get_cell(0, 0).assign == ""
+test_map.get_cell(0, 0).assign = uav.name
+assert np.array_equal(
+    test_map.get_assigned_mask(uav), np.array([[1, 1, 0], [0, 0, 0]], dtype=bool)
+)
+
+test_map.get_cell(1, 0).cell_type = CellType.FREE
+assert test_map.get_cell(1, 0).cell_type == CellType.FREE
+assert test_map.to_numpy()[1, 0] == CellType.FREE.value
+
+test_map.clear_assignment()
+assert test_map.get_cell(0, 1).assign == ""
+assert not test_map.get_assigned_mask(uav).any()
+
+# The assignment matrix is a view of the map's labels, indexed by uav order
+uavs = [UAV(name=f"UAV-{i}", has_color=False) for i in range(3)]
+test_map.set_assignment_matrix(np.array([[0, 0, -1], [1, 1, 2]]), uavs)
+assert test_map.get_cell(1, 2).assign == uavs[2].name
+assigned = test_map.get_assignment_matrix(uavs)
+assert assigned is test_map.get_assignment_matrix(uavs)
+assigned[0, 1] = 2
+assert test_map.get_cell(0, 1).assign == uavs[2].name
+
+# Reordering or dropping uavs relabels the matrix in place
+assigned = test_map.get_assignment_matrix([uavs[2], uavs[0]])
+assert np.array_equal(assigned, np.array([[1, 0, -1], [-1, -1, 0]]))
+assert test_map.get_cell(1, 0).assign == ""
+
+# Occupying a cell drops its assignment
+test_map.get_cell(0, 0).cell_type = CellType.OCCUPIED
+assert assigned[0, 0] == -1
+
+# Free and occupied cell indexes follow cell type changes
+edited_map = Map.from_numpy(grid)
+version = edited_map.version
+assert edited_map.free_cell_count == 4
+assert edited_map.occupied_cell_count == 2
+edited_map.get_cell(0, 0).cell_type = CellType.OCCUPIED
+edited_map.get_cell(0, 2).cell_type = CellType.FREE
+edited_map.get_cell(0, 2).cell_type = CellType.FREE
+assert edited_map.version == version + 2
+assert edited_map.free_cell_count == len(edited_map.free_cells) == 4
+assert sorted(edited_map.free_cell_indices.tolist()) == [1, 2, 4, 5]
+assert sorted(edited_map.occupied_cell_indices.tolist()) == [0, 3]
+assert sorted(cell.coordinate for cell in edited_map.occupied_cells) == [(0, 0), (1, 0)]
+assert all(cell.cell_type == CellType.FREE for cell in edited_map.free_cells)
+print("OK")
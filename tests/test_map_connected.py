@@ -22,7 +22,7 @@ for img in os.listdir(images_root):
         trajectory = uav.trajectory
         assert trajectory is not None, "Trajectory is not set"
         n = len(trajectory)
-        trajectory_cells = set(cell.coordinate for cell in trajectory)
+        trajectory_cells = set(map(tuple, trajectory.tolist()))
         assert all(
             free_cell.coordinate in trajectory_cells
             for free_cell in test_map.free_cells
@@ -30,11 +30,11 @@ for img in os.listdir(images_root):
 
         for i in range(n):
             assert (
-                test_map.get_cell(*trajectory[i].coordinate).cell_type == CellType.FREE
+                test_map.get_cell(*trajectory[i]).cell_type == CellType.FREE
             ), f"Covers occupied cell: {trajectory[i]}"
-            assert trajectory[i].distance(trajectory[(i + 1) % n]) <= np.sqrt(
+            assert np.hypot(*(trajectory[i] - trajectory[(i + 1) % n])) <= np.sqrt(
                 2
-            ), f"Not adjacent cells: {trajectory}"
+            ), f"Not adjacent cells: {trajectory.tolist()}"
     except ValueError as err:
         print(f"Failed to run: {err.args[0]}")
         continue
@@ -0,0 +1,93 @@
+import os
+import tempfile
+
+import numpy as np
+
+from src.core.cell import CellType
+from src.core.map import Map
+from src.core.utils import (
+    evict_map_cache,
+    load_map_from_file,
+    read_map_file_header,
+    save_map_to_file,
+)
+
+cell_types = np.array(
+    [
+        [0, 0, 1, 0],
+        [0, 1, 1, 0],
+        [1, 1, 0, 0],
+    ],
+    dtype=np.uint8,
+)
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    map_file = os.path.join(tmp_dir, "test.map")
+    save_map_to_file(Map.from_numpy(cell_types), map_file)
+
+    header = read_map_file_header(map_file)
+    assert (header.height, header.width) == (3, 4)
+    assert header.free_cell_count == 7
+    assert header.components == 2
+
+    loaded = load_map_from_file(map_file)
+    assert (loaded.to_numpy() == cell_types).all()
+    assert loaded.free_cell_count == 7
+
+    # Changes to a loaded map never reach the file
+    loaded.set_cell_type(0, 0, CellType.OCCUPIED)
+    assert loaded.free_cell_count == 6
+    assert (load_map_from_file(map_file).to_numpy() == cell_types).all()
+
+    with open(map_file, "r+b") as f:
+        f.write(b"NOTAMAP!")
+    try:
+        load_map_from_file(map_file)
+        raise AssertionError("Invalid header must be rejected")
+    except ValueError:
+        pass
+
+    # Parsed images are cached by content and loader parameters
+    img_file = os.path.join(tmp_dir, "test.png")
+    save_map_to_file(Map.from_numpy(cell_types), img_file)
+    cache_dir = os.path.join(tmp_dir, "cache")
+    first = load_map_from_file(img_file, cache_dir=cache_dir)
+    cached = load_map_from_file(img_file, cache_dir=cache_dir)
+    assert (first.to_numpy() == cell_types).all()
+    assert (cached.to_numpy() == cell_types).all()
+    assert len(os.listdir(cache_dir)) == 1
+    resized = load_map_from_file(img_file, cache_dir=cache_dir, resize=(8, 6))
+    assert (resized.height, resized.width) == (6, 8)
+    assert len(os.listdir(cache_dir)) == 2
+
+    # Maps that cannot be removed, e.g. still mapped on Windows, are skipped
+    remove = os.remove
+
+    def remove_unless_mapped(path: str) -> None:
+        if path.endswith(".map"):
+            raise PermissionError(path)
+        remove(path)
+
+    os.remove = remove_unless_mapped  # type: ignore
+    try:
+        assert load_map_from_file(img_file, cache_dir=cache_dir, threshold=1)
+        evict_map_cache(cache_dir, cache_size=0)
+        assert len(os.listdir(cache_dir)) == 3
+    finally:
+        os.remove = remove  # type: ignore
+    replace = os.replace
+
+    def replace_mapped(src: str, dst: str) -> None:
+        raise PermissionError(dst)
+
+    os.replace = replace_mapped  # type: ignore
+    try:
+        loaded = load_map_from_file(img_file, cache_dir=cache_dir, threshold=2)
+        assert (loaded.to_numpy() == cell_types).all()
+        assert len(os.listdir(cache_dir)) == 3
+    finally:
+        os.replace = replace  # type: ignore
+
+    evict_map_cache(cache_dir, cache_size=0)
+    assert os.listdir(cache_dir) == []
+print("OK")
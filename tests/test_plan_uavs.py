@@ -0,0 +1,43 @@
+import numpy as np
+
+import src.planner.cpp.single.planner as single_planner
+from src.core.cell import CellType
+from src.core.map import Map
+from src.core.uav import UAV
+from src.planner.cpp.single.planner import PlanPool, TrajectoryCache, plan_uavs
+
+cell_types = np.zeros((10, 11), dtype=np.uint8)
+cell_types[4, 2:7] = CellType.OCCUPIED.value
+assignment = np.zeros(cell_types.shape, dtype=int)
+assignment[:, 3:] = 1
+assignment[5:, 3:8] = 2
+positions = [(8, 0), (1, 9), (6, 5)]
+
+
+def plan(pool: PlanPool | None = None, **kwargs) -> list[list[list[int]]]:
+    area = Map(cell_types.copy())
+    uavs = [UAV(r=r, c=c, has_color=False) for r, c in positions]
+    area.set_assignment_matrix(assignment, uavs)
+    if pool is None:
+        plan_uavs("STC", area, uavs, **kwargs)
+    else:
+        pool.plan(area, uavs)
+    return [uav.trajectory.tolist() for uav in uavs]
+
+
+# Regions planned by a pool get the same trajectories as planned serially
+serial = plan()
+single_planner.PARALLEL_PLAN_MIN_CELLS = 0
+assert plan(workers=2) == serial
+assert plan(workers=2, executor="thread") == serial
+cache = TrajectoryCache()
+assert plan(workers=2, cache=cache) == plan(workers=2, cache=cache) == serial
+assert (cache.hits, cache.misses) == (3, 3)
+
+# The workers of a pool are kept between plans until it is closed
+with PlanPool("STC", workers=2, executor="thread") as pool:
+    assert plan(pool) == serial
+    workers = pool._pool
+    assert plan(pool) == serial and pool._pool is workers
+assert pool._pool is None
+print("OK")
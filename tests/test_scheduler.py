@@ -0,0 +1,50 @@
+import numpy as np
+
+from src.planner.cpp import scheduler as transfer_scheduler
+from src.planner.cpp.scheduler import TransferScheduler, schedule_batches
+from src.planner.cpp.utils import transfer_area_between
+
+# Conflicting tasks keep their order, the others share a batch
+assert schedule_batches([{0, 1}, {2, 3}, {1, 2}, {4, 5}, {0}]) == [[0, 1, 3], [2, 4]]
+assert schedule_batches([]) == []
+
+assigned = np.array(
+    [
+        [0, 0, 0, 1, 2, 2, 2, 3],
+        [0, 0, 0, 1, 2, 2, 2, 3],
+        [0, 0, 0, 1, 2, 2, 2, 3],
+        [4, 4, 4, 4, 5, 5, 5, 5],
+    ]
+)
+# Run the tiny matrix below in parallel
+transfer_scheduler.PARALLEL_TRANSFER_MIN_CELLS = 0
+transfers = [(0, 1, 4, (0, 0)), (2, 3, 4, (0, 4)), (1, 4, 2, (0, 3)), (5, 4, 2, (3, 7))]
+
+
+def run(scheduler: TransferScheduler) -> tuple[np.ndarray, list[int]]:
+    result = assigned.copy()
+    for sender, receiver, amount, pos in transfers:
+        scheduler.submit(
+            (sender, receiver),
+            transfer_area_between,
+            sender,
+            receiver,
+            amount,
+            init_seller_pos=pos,
+        )
+    return result, scheduler.run(result)
+
+
+serial, serial_transferred = run(TransferScheduler(0))
+with TransferScheduler(2) as scheduler:
+    parallel, parallel_transferred = run(scheduler)
+    # The worker processes and the shared matrix are kept between runs
+    pool = scheduler._pool
+    assert pool is not None
+    rerun, rerun_transferred = run(scheduler)
+    assert scheduler._pool is pool
+assert scheduler._pool is None
+assert serial_transferred == parallel_transferred == rerun_transferred == [4, 4, 2, 2]
+assert (serial == parallel).all() and (serial == rerun).all()
+assert np.count_nonzero(serial == 1) == 5
+print("OK")
@@ -1,7 +1,11 @@
 import os
 
+import numpy as np
+
 from src.core.cell import CellType
+from src.core.map import Map
 from src.planner.cpp.single.planner import SingleCoveragePathPlannerFactory
+from src.planner.cpp.single.stc import _build_mega_graph
 from src.core.uav import UAV
 from src.core.utils import load_map_from_text_file
 
@@ -24,7 +28,7 @@ def _assert_trajectory(_uav: UAV, length: float) -> None:
         print("OK")
     except AssertionError:
         print(f"FAILED: got {got}, want {length}")
-        print([(cell.r, cell.c) for cell in _uav.trajectory])
+        print(_uav.trajectory.tolist())
 
 
 for test_map_path, want_length in test_suite:
@@ -38,3 +42,33 @@ for test_map_path, want_length in test_suite:
     stc = SingleCoveragePathPlannerFactory.get_planner("STC", test_map, uav)
     stc.plan()
     _assert_trajectory(uav, want_length)
+
+# Planning a region away from the origin gives the same, translated, trajectory
+test_map = load_map_from_text_file(test_suite[-1][0])
+cell_types = np.ones((test_map.height + 9, test_map.width + 7), dtype=np.uint8)
+cell_types[4 : 4 + test_map.height, 6 : 6 + test_map.width] = test_map.to_numpy()
+moved_map = Map.from_numpy(cell_types)
+moved_uav = UAV(r=4, c=6)
+for row in range(moved_map.height):
+    for col in range(moved_map.width):
+        if moved_map.get_cell(row, col).cell_type == CellType.FREE:
+            moved_map.assign(row, col, moved_uav)
+SingleCoveragePathPlannerFactory.get_planner("STC", moved_map, moved_uav).plan()
+assert (moved_uav.trajectory == uav.trajectory + (4, 6)).all()
+print("OK")
+
+# Mega cells linked through both, or only one, of their contacting cell pairs
+mega_free, links = _build_mega_graph(
+    np.array(
+        [
+            [1, 1, 1, 1, 0, 0],
+            [1, 1, 0, 1, 0, 0],
+            [1, 1, 0, 0, 0, 1],
+        ],
+        dtype=bool,
+    ),
+    [(0, 1), (1, 0), (0, -1), (-1, 0)],
+)
+assert mega_free.tolist() == [[True, True, False]]
+assert links.tolist() == [[0b00010000, 0b01000000, 0]]
+print("OK")
@@ -0,0 +1,78 @@
+import numpy as np
+
+from src.core.cell import CellType
+from src.core.map import Map
+from src.core.uav import UAV
+from src.planner.cpp.single.planner import (
+    SingleCoveragePathPlannerFactory,
+    TrajectoryCache,
+)
+
+cell_types = np.zeros((6, 8), dtype=np.uint8)
+cell_types[2, 3] = CellType.OCCUPIED.value
+area = Map(cell_types)
+uav = UAV(r=0, c=0, has_color=False)
+other = UAV(r=5, c=7, has_color=False)
+assignment = np.zeros(cell_types.shape, dtype=int)
+assignment[:, 4:] = 1
+assignment[2, 3] = -1
+area.set_assignment_matrix(assignment, [uav, other])
+
+cache = TrajectoryCache()
+SingleCoveragePathPlannerFactory.get_planner("STC", area, uav, cache=cache).plan()
+planned = uav.trajectory.copy()
+assert (cache.hits, cache.misses, len(cache)) == (0, 1, 1)
+
+# An unchanged region is not planned again from the same position
+SingleCoveragePathPlannerFactory.get_planner("STC", area, uav, cache=cache).plan()
+assert cache.hits == 1
+assert (uav.trajectory == planned).all()
+# Planners start their tree or sweep at the UAV, so other positions are planned
+for _ in range(5):
+    uav.move()
+SingleCoveragePathPlannerFactory.get_planner("STC", area, uav, cache=cache).plan()
+assert (cache.hits, cache.misses) == (1, 2)
+uav.r, uav.c = 0, 0
+uav.update_trajectory(planned)
+
+# Other regions and options are planned
+SingleCoveragePathPlannerFactory.get_planner("STC", area, other, cache=cache).plan()
+SingleCoveragePathPlannerFactory.get_planner(
+    "STC", area, uav, cache=cache, mst_algo="dfs"
+).plan()
+assert (cache.hits, cache.misses, len(cache)) == (1, 4, 4)
+
+# Keys only depend on the region, the start position, the planner and its options
+mask = area.get_assigned_mask(uav)
+key = TrajectoryCache.key("STC", mask, (0, 0))
+assert key == TrajectoryCache.key("STC", mask.copy(), (0, 0))
+assert key != TrajectoryCache.key("STC", mask, (0, 1))
+assert key != TrajectoryCache.key("STC", mask, (0, 0), mst_algo="dfs")
+
+# The least recently used trajectories are evicted first
+cache.cache_size = cache.size - 1
+cache.put(b"key", np.zeros((1, 2), dtype=np.int32))
+assert len(cache) == 4 and cache.size <= cache.cache_size
+SingleCoveragePathPlannerFactory.get_planner("STC", area, other, cache=cache).plan()
+assert cache.hits == 2
+
+# A cached trajectory is the one every registered planner plans without the cache
+for name in SingleCoveragePathPlannerFactory._registry:
+    for kwargs in [{}, {"mst_algo": "dfs"}] if name == "STC" else [{}]:
+        cache = TrajectoryCache()
+        uav.r, uav.c = 0, 0
+        SingleCoveragePathPlannerFactory.get_planner(
+            name, area, uav, cache=cache, **kwargs
+        ).plan()
+        uav.r, uav.c = 3, 1
+        SingleCoveragePathPlannerFactory.get_planner(
+            name, area, uav, cache=cache, **kwargs
+        ).plan()
+        SingleCoveragePathPlannerFactory.get_planner(name, area, uav, **kwargs).plan()
+        fresh = uav.trajectory.copy()
+        SingleCoveragePathPlannerFactory.get_planner(
+            name, area, uav, cache=cache, **kwargs
+        ).plan()
+        assert (cache.hits, cache.misses) == (1, 2), name
+        assert np.array_equal(uav.trajectory, fresh), name
+print("OK")
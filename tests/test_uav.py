@@ -0,0 +1,49 @@
+import numpy as np
+
+from src.core.uav import UAV
+
+# A 2x2 square, then one diagonal step back to the start
+square = [(0, 0), (0, 1), (1, 1), (1, 0)]
+uav = UAV(name="UAV-1", r=1, c=1, trajectory=square, has_color=False)
+assert uav.trajectory.shape == (4, 2)
+assert uav.pos_idx == 2
+assert abs(uav.trajectory_length - 4.0) < 1e-9
+
+uav.move()
+uav.move()
+assert (uav.r, uav.c) == (0, 0)
+assert uav.movement == [(1, 1), (1, 0), (0, 0)]
+
+uav.update_trajectory(np.array([(0, 0), (0, 1), (1, 1)]))
+assert uav.pos_idx == 0
+assert abs(uav.trajectory_length - (2 + np.sqrt(2))) < 1e-9
+
+try:
+    UAV(name="UAV-2", r=5, c=5, trajectory=square, has_color=False)
+    raise AssertionError("Position outside the trajectory must be rejected")
+except ValueError:
+    pass
+
+# Ring buffer keeps the last moves only
+uav = UAV(r=0, c=0, trajectory=square, has_color=False, history_capacity=3)
+for _ in range(5):
+    uav.move()
+assert uav.movement == [(1, 0), (0, 0), (0, 1)]
+assert uav.history.to_numpy().shape == (3, 2)
+
+# Downsampling records one of every `stride` positions
+uav = UAV(r=0, c=0, trajectory=square, has_color=False, history_stride=2)
+for _ in range(4):
+    uav.move()
+assert uav.movement == [(0, 0), (1, 1), (0, 0)]
+
+# History off
+uav = UAV(r=0, c=0, trajectory=square, has_color=False, history_capacity=0)
+for _ in range(100):
+    uav.move()
+assert uav.movement == []
+assert (uav.r, uav.c) == (0, 0)
+
+uav.reset()
+assert len(uav.history) == 0
+print("OK")
@@ -0,0 +1,162 @@
+import numpy as np
+
+from src.planner.cpp.utils import (
+    DisjointSet,
+    LabelIndex,
+    PartitionState,
+    _is_not_bridge,
+    _transfer_parts,
+    _transfer_subtrees,
+    construct_adj_list,
+    dfs_weighted_tree,
+    get_adjacent_cells,
+    get_boundary_lengths,
+    get_neighbors,
+    get_partition,
+    iter_post_order,
+    transfer_area_subtree,
+    transfer_concurrently,
+    voronoi_partition,
+)
+
+assigned = np.array(
+    [
+        [0, 0, 1, 1],
+        [0, -1, -1, 1],
+        [2, 2, 3, 1],
+    ]
+)
+
+# Label 0 only touches label 2 from above
+adj_list = construct_adj_list(assigned)
+assert adj_list == {0: {1, 2}, 1: {0, 3}, 2: {0, 3}, 3: {1, 2}}
+assert construct_adj_list(np.full((2, 2), -1)) == {}
+
+boundary_lengths = get_boundary_lengths(assigned)
+assert boundary_lengths[0, 2] == boundary_lengths[2, 0] == 1
+assert boundary_lengths[0, 1] == 1
+assert boundary_lengths[1, 3] == 1
+assert (0, 3) not in boundary_lengths
+
+label_index = LabelIndex(assigned, 4)
+assert label_index.counts.tolist() == [3, 4, 2, 1]
+assert label_index.cells(1).tolist() == [[0, 2], [0, 3], [1, 3], [2, 3]]
+
+partition = get_partition(assigned, 5)
+assert partition[0] == [(0, 0), (0, 1), (1, 0)]
+assert partition[4] == []
+
+assert get_neighbors(assigned, partition[0]) == {1: {(0, 2)}, 2: {(2, 0)}}
+assert get_adjacent_cells(assigned, 2, 0) == {(2, 0)}
+assert get_adjacent_cells(assigned, 1, 3) == {(2, 3)}
+assert get_adjacent_cells(assigned, 0, 3) == set()
+# Removable cells, decided locally and through the region
+ring = np.array(
+    [
+        [0, 0, 0],
+        [-1, 0, -1],
+        [0, 0, 0],
+    ]
+)
+assert _is_not_bridge(ring, (0, 0))
+assert not _is_not_bridge(ring, (1, 1))
+loop = np.array(
+    [
+        [0, 0, 0, 0],
+        [0, -1, -1, 0],
+        [0, 0, 0, 0],
+    ]
+)
+assert _is_not_bridge(loop, (0, 1))
+assert not _is_not_bridge(loop[:2], (0, 1))
+assert (loop[1, 1:3] == -1).all() and loop[0, 1] == 0
+# A region with a loop on the left and a tail on the right
+region = np.array(
+    [
+        [0, 0, 0, 0, 0],
+        [0, -1, 0, -1, 0],
+        [0, 0, 0, -1, 0],
+    ]
+)
+assert _is_not_bridge(region, (1, 0))
+assert not _is_not_bridge(region, (0, 3))
+parts = _transfer_parts(region, (0, 3), (0, 0))
+assert parts == [(1, 3)]
+assert _transfer_subtrees(region, (0, 3), parts) == [{(0, 4), (1, 4), (2, 4)}]
+# Without a position to keep, every part is cut off
+assert _transfer_parts(region, (0, 3), None) == [(0, 8), (1, 3)]
+region[0, 4] = 1
+assert _transfer_parts(region, (0, 3), (0, 0)) == []
+# The part holding the seller's position is kept even when it is searched out first
+line = np.array([[0] * 10 + [1]])
+assert _transfer_parts(line, (0, 2), (0, 0)) == [(1, 7)]
+assert transfer_area_subtree(0, 1, {(0, 2)}, 20, line, (0, 0)) == 8
+assert line.tolist() == [[0, 0] + [1] * 9]
+line = np.array([[0] * 10 + [1]])
+transfer_concurrently(0, {1: 20}, line, (0, 0))
+assert line[0, 0] == 0
+# The partition state follows relabeled cells
+partition = PartitionState(assigned.copy(), 4)
+assert partition.counts.tolist() == [3, 4, 2, 1]
+assert partition.neighbors(0) == get_neighbors(assigned, get_partition(assigned, 4)[0])
+assert partition.boundary(2, 0) == {(2, 0)}
+partition.relabel((0, 1), 1)
+assert partition.counts.tolist() == [2, 5, 2, 1]
+assert partition.neighbors(0) == {1: {(0, 1)}, 2: {(2, 0)}}
+assert partition.boundary(1, 0) == {(0, 1)}
+assert partition.assigned[0, 1] == 1
+assert (
+    sorted(partition.cells(1).tolist()) == np.argwhere(partition.assigned == 1).tolist()
+)
+assert sorted(partition.cells(0).tolist()) == [[0, 0], [1, 0]]
+partition.relabel_all(3, 2)
+assert partition.counts.tolist() == [2, 5, 3, 0]
+assert partition.neighbors(3) == {}
+assert partition.cells(3).tolist() == []
+assert (
+    sorted(partition.cells(2).tolist()) == np.argwhere(partition.assigned == 2).tolist()
+)
+# Subtree sizes and weights of the spanning tree, without recursion
+children, node_weight = dfs_weighted_tree(adj_list, np.array([3, 4, 2, 1, 5]), 0)
+assert [c.tolist() for c in children] == [[1, 2], [3], [], [], []]
+assert node_weight.tolist() == [[4, 10], [2, 5], [1, 2], [1, 1], [0, 0]]
+post_order = list(iter_post_order(children, 0, key=lambda node: -node))
+assert post_order == [(2, 0), (3, 1), (1, 0)]
+chain = {i: {i - 1, i + 1} & set(range(5000)) for i in range(5000)}
+children, node_weight = dfs_weighted_tree(chain, np.ones(5000, dtype=int), 0)
+assert node_weight[0].tolist() == [5000, 5000]
+assert next(iter_post_order(children, 0, key=int)) == (4999, 4998)
+# Disjoint sets over flat indices, without recursion on long chains
+sets = DisjointSet(5)
+assert sets.union(0, 1) and sets.union(3, 4)
+assert not sets.union(1, 0)
+assert sets.find(0) == sets.find(1) != sets.find(2)
+assert sets.union_all([1, 2, 0, 4], [2, 1, 2, 1]) == [0, 3]
+assert sets.n_components == 1
+chain = DisjointSet(100000)
+assert len(chain.union_all(list(range(1, 100000)), list(range(99999)))) == 99999
+assert chain.find(99999) == chain.find(0)
+# Nearest source of each cell by BFS
+free = np.array(
+    [
+        [1, 1, 1, 1, 1],
+        [1, 0, 1, 0, 0],
+        [1, 1, 1, 0, 1],
+    ],
+    dtype=bool,
+)
+# A source on a cell that is not free still grows, a repeated source is skipped
+assert voronoi_partition(free, [(0, 0), (0, 4), (0, 4), (1, 3)]).tolist() == [
+    [0, 0, 0, 1, 1],
+    [0, -1, 3, 3, -1],
+    [0, 0, 3, -1, -1],
+]
+# Ties go to the source that reaches the cell first
+assert voronoi_partition(free, [(0, 4), (0, 0)]).tolist()[0] == [1, 1, 0, 0, 0]
+# Regions with a capacity leave the cells they cannot take to the others
+corridor = np.ones((1, 10), dtype=bool)
+assert voronoi_partition(corridor, [(0, 2), (0, 9)]).tolist() == [[0] * 6 + [1] * 4]
+assert voronoi_partition(corridor, [(0, 2), (0, 9)], capacity=5).tolist() == [
+    [0] * 5 + [1] * 5
+]
+print("OK")